@@ -0,0 +1,329 @@
+'''
+Benchmark AwsRds against a synthetic RDS fleet.
+
+The RDS client is a real botocore client: a before-call handler answers every RDS
+operation from a synthetic fleet generated on demand, so parameter validation,
+paginators and retries run as in production while no request leaves the machine.
+Snapshots and log lines are computed from their position instead of being stored,
+so a 200k snapshot account or a multi-GB log costs no memory in the backend itself.
+
+Usage:
+    python benchmarks/benchmark.py --scale full --out results.json
+    python benchmarks/benchmark.py --scale full --compare results.json
+'''
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from datetime import timedelta
+
+import boto3
+from botocore.awsrequest import AWSResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from AwsRds import AwsRds
+from RdsLogMetrics import LogMetrics
+
+
+SCALES = {
+    "small": {"Instances": 500, "Clusters": 50, "Snapshots": 20000, "LogMB": 20},
+    "full": {"Instances": 5000, "Clusters": 500, "Snapshots": 200000, "LogMB": 2048},
+}
+
+EPOCH = datetime(2024, 1, 1)
+PAGE = 100
+PORTION_BYTES = 1024 * 1024
+
+
+class SyntheticRds:
+    '''
+    Synthetic RDS backend answering the operations used by AwsRds.
+
+    Instance i belongs to cluster i % Clusters, snapshot j belongs to cluster j % Clusters.
+    The log file is LogMB of RDS PostgreSQL lines, one in ten is a slow query.
+    '''
+
+    def __init__(self,Instances: int,Clusters: int,Snapshots: int,LogMB: int):
+        self.instances = Instances
+        self.clusters = Clusters
+        self.snapshots = Snapshots
+        self.log_bytes = LogMB * 1024 * 1024
+        self.calls = Counter()
+        self.log_file = "error/postgresql.log.2024-01-01-00"
+
+    ####################################################################################################
+    ##  RESOURCES
+    ####################################################################################################
+
+    def Instance(self,i: int):
+        clu = i % self.clusters
+        return {
+            "DBInstanceIdentifier": f"db-{i:05d}",
+            "DBInstanceArn": f"arn:aws:rds:us-east-1:123456789012:db:db-{i:05d}",
+            "DBInstanceClass": "db.r6g.large",
+            "Engine": "aurora-postgresql" if i % 4 else "postgres",
+            "DBInstanceStatus": "available" if i % 10 else "stopped",
+            "DBClusterIdentifier": f"cluster-{clu:04d}",
+            "TagList": [{"Key": "env", "Value": ("PROD", "DEV", "QA")[clu % 3]}, {"Key": "team", "Value": f"team-{clu % 25}"}],
+        }
+
+    def Cluster(self,c: int):
+        return {
+            "DBClusterIdentifier": f"cluster-{c:04d}",
+            "DBClusterArn": f"arn:aws:rds:us-east-1:123456789012:cluster:cluster-{c:04d}",
+            "Engine": "aurora-postgresql",
+            "Status": "available",
+            "DBClusterMembers": [{"DBInstanceIdentifier": f"db-{i:05d}", "IsClusterWriter": i < self.clusters} for i in range(c, self.instances, self.clusters)],
+            "TagList": [{"Key": "env", "Value": ("PROD", "DEV", "QA")[c % 3]}],
+        }
+
+    def Snapshot(self,j: int):
+        return {
+            "DBClusterSnapshotIdentifier": f"snap-{j:07d}",
+            "DBClusterSnapshotArn": f"arn:aws:rds:us-east-1:123456789012:cluster-snapshot:snap-{j:07d}",
+            "DBClusterIdentifier": f"cluster-{j % self.clusters:04d}",
+            "SnapshotCreateTime": EPOCH + timedelta(minutes=j),
+            "Engine": "aurora-postgresql",
+            "Status": "available",
+            "SnapshotType": "automated",
+        }
+
+    def LogLine(self,n: int):
+        ts = (EPOCH + timedelta(milliseconds=n * 10)).strftime("%Y-%m-%d %H:%M:%S")
+        pid = 1000 + n % 97
+
+        if n % 10 == 0:
+            return (f"{ts} UTC:10.0.0.{n % 250}(5432):app@orders:[{pid}]:LOG:  duration: {(n * 7919) % 60000 / 10:.3f} ms  statement: SELECT o.id, o.total\n"
+                    f"\tFROM orders o WHERE o.customer_id = {n % 5000} AND o.status IN ('new', 'paid', 'sent')\n")
+        if n % 10 == 5:
+            return f"{ts} UTC:10.0.0.{n % 250}(5432):app@orders:[{pid}]:ERROR:  duplicate key value violates unique constraint \"orders_pkey\"\n"
+
+        return f"{ts} UTC:10.0.0.{n % 250}(5432):app@orders:[{pid}]:LOG:  connection authorized: user=app database=orders\n"
+
+    ####################################################################################################
+    ##  OPERATIONS
+    ####################################################################################################
+
+    def _Page(self,Items,Count: int,Key: str,Params: dict):
+        start = int(Params.get("Marker") or 0)
+        size = min(Params.get("MaxRecords") or PAGE, PAGE)
+        page = {Key: [Items(x) for x in range(start, min(start + size, Count))]}
+
+        if start + size < Count:
+            page["Marker"] = str(start + size)
+
+        return page
+
+    def DescribeDBInstances(self,Params):
+        idx = list(range(self.instances))
+
+        if "DBInstanceIdentifier" in Params:
+            idx = [int(Params["DBInstanceIdentifier"].split("-")[1])]
+
+        for filt in Params.get("Filters", []):
+            if filt["Name"] == "db-instance-id":
+                idx = [int(name.split("-")[1]) for name in filt["Values"]]
+
+        return self._Page(lambda x: self.Instance(idx[x]), len(idx), "DBInstances", Params)
+
+    def DescribeDBClusters(self,Params):
+        idx = list(range(self.clusters))
+
+        if "DBClusterIdentifier" in Params:
+            idx = [int(Params["DBClusterIdentifier"].split("-")[1])]
+
+        for filt in Params.get("Filters", []):
+            if filt["Name"] == "db-cluster-id":
+                idx = [int(name.split("-")[1]) for name in filt["Values"]]
+
+        return self._Page(lambda x: self.Cluster(idx[x]), len(idx), "DBClusters", Params)
+
+    def DescribeDBClusterSnapshots(self,Params):
+        if "DBClusterIdentifier" in Params:
+            clu = int(Params["DBClusterIdentifier"].split("-")[1])
+            count = len(range(clu, self.snapshots, self.clusters))
+            return self._Page(lambda x: self.Snapshot(clu + x * self.clusters), count, "DBClusterSnapshots", Params)
+
+        return self._Page(self.Snapshot, self.snapshots, "DBClusterSnapshots", Params)
+
+    def ListTagsForResource(self,Params):
+        name = Params["ResourceName"].rsplit(":", 1)[1]
+
+        if name.startswith("db-"):
+            return {"TagList": self.Instance(int(name.split("-")[1]))["TagList"]}
+        if name.startswith("cluster-"):
+            return {"TagList": self.Cluster(int(name.split("-")[1]))["TagList"]}
+
+        return {"TagList": []}
+
+    def DescribeDBLogFiles(self,Params):
+        logs = [{"LogFileName": self.log_file, "LastWritten": int(time.time() * 1000), "Size": self.log_bytes}]
+        return self._Page(lambda x: logs[x], len(logs), "DescribeDBLogFiles", Params)
+
+    def DownloadDBLogFilePortion(self,Params):
+        #MARKER = LINE NUMBER:BYTES SO FAR
+        marker = str(Params.get("Marker") or "0")
+        line, size = (int(x) for x in marker.split(":")) if ":" in marker else (0, 0)
+        lines = []
+        portion = 0
+        limit = Params.get("NumberOfLines") or sys.maxsize
+
+        while size < self.log_bytes and portion < PORTION_BYTES and len(lines) < limit:
+            val = self.LogLine(line)
+            lines.append(val)
+            portion += len(val)
+            size += len(val)
+            line += 1
+
+        return {"LogFileData": "".join(lines), "Marker": f"{line}:{size}", "AdditionalDataPending": size < self.log_bytes}
+
+    def Capture(self,params,context,**kwargs):
+        '''
+        before-parameter-build handler, keeps the API parameters for Handle.
+        '''
+
+        context["SyntheticParams"] = dict(params)
+
+    def Handle(self,model,context,**kwargs):
+        '''
+        before-call handler, returning (http response, parsed response) skips the request.
+        '''
+
+        self.calls[model.name] += 1
+        handler = getattr(self, model.name, None)
+        parsed = handler(context.get("SyntheticParams", {})) if handler else {}
+
+        return (AWSResponse(None, 200, {}, None), parsed)
+
+
+def Client(Backend: SyntheticRds):
+    '''
+    AwsRds whose RDS client is answered by the synthetic backend.
+    '''
+
+    rds = AwsRds("benchmark", "us-east-1")
+    rds._session = boto3.Session(aws_access_key_id="benchmark", aws_secret_access_key="benchmark", region_name="us-east-1")
+    rds.rds.meta.events.register("before-parameter-build.rds", Backend.Capture)
+    rds.rds.meta.events.register("before-call.rds", Backend.Handle)
+
+    return rds
+
+
+def Benchmarks(Backend: SyntheticRds,Tmp: str):
+    '''
+    Name -> callable(AwsRds) of every benchmark.
+    '''
+
+    mid = f"db-{Backend.instances // 2:05d}"
+
+    return {
+        "GetInstance": lambda rds: rds.GetInstance(),
+        "Exists": lambda rds: [rds.Exists(f"db-{i:05d}", False) for i in range(0, Backend.instances, max(Backend.instances // 50, 1))],
+        "GetInstanceByTag": lambda rds: rds.GetInstanceByTag("env", "PROD"),
+        "GetInstanceCluster": lambda rds: [rds.GetInstanceCluster(f"db-{i:05d}") for i in range(0, Backend.instances, max(Backend.instances // 50, 1))],
+        "GetInstanceClusters": lambda rds: rds.GetInstanceClusters([f"db-{i:05d}" for i in range(Backend.instances)]),
+        "GetTopSnapshot(ALL)": lambda rds: rds.GetTopSnapshot("ALL", "DESC"),
+        "GetTopSnapshot(Instance)": lambda rds: rds.GetTopSnapshot(mid, "DESC"),
+        "GetSnapshotByInstance": lambda rds: rds.GetSnapshotByInstance(mid),
+        "IterClusterSnapshots(dict)": lambda rds: len(list(rds.IterClusterSnapshots())),
+        "IterClusterSnapshots(Records)": lambda rds: len(list(rds.IterClusterSnapshots(Records=True))),
+        "SnapshotExists(miss)": lambda rds: rds.SnapshotExists("snap-missing"),
+        "GetModifiedLogs": lambda rds: rds.GetModifiedLogs(mid, 60),
+        "DownloadLogs": lambda rds: rds.DownloadLogs(mid, Backend.log_file, os.path.join(Tmp, "log")),
+        "DownloadSlowQueries": lambda rds: rds.DownloadSlowQueries(mid, Backend.log_file, os.path.join(Tmp, "slow")),
+        "SearchLogs": lambda rds: sum(1 for _ in rds.SearchLogs([mid], r"customer_id = 4240\b", EPOCH)),
+        "AggregateSlowQueries": lambda rds: len(rds.AggregateSlowQueries(mid, Backend.log_file)),
+        "IterLogRecords": lambda rds: sum(1 for _ in rds.IterLogRecords(mid, Backend.log_file)),
+        "IterLogRecords(ERROR)": lambda rds: sum(1 for _ in rds.IterLogRecords(mid, Backend.log_file, "ERROR")),
+        "IterLogRecords(PANIC)": lambda rds: sum(1 for _ in rds.IterLogRecords(mid, Backend.log_file, "PANIC")),
+        "LogMetrics": lambda rds: LogMetrics().AddRecords(rds.IterLogRecords(mid, Backend.log_file)).Snapshot(EPOCH.timestamp() + 900)[60]["Statements"],
+    }
+
+
+def Measure(Backend: SyntheticRds,Name: str,Func,Memory: bool):
+    '''
+    Run one benchmark on a cold AwsRds.
+
+    Returns
+        {Seconds, PeakMB, Calls, ApiCalls}
+    '''
+
+    Backend.calls.clear()
+    rds = Client(Backend)
+    st = time.perf_counter()
+    Func(rds)
+    seconds = time.perf_counter() - st
+    calls = dict(Backend.calls)
+
+    peak = None
+    if Memory:
+        rds = Client(Backend)
+        tracemalloc.start()
+        Func(rds)
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    return {"Seconds": round(seconds, 4), "PeakMB": round(peak, 2) if peak is not None else None, "Calls": calls, "ApiCalls": sum(calls.values())}
+
+
+def Compare(Results: dict,Baseline: dict):
+    '''
+    Print the results next to a baseline run.
+    '''
+
+    print(f"{'Benchmark':<26}{'Seconds':>12}{'Base':>12}{'Ratio':>8}{'PeakMB':>10}{'Base':>10}{'Calls':>8}{'Base':>8}")
+
+    for name, row in Results["Benchmarks"].items():
+        base = Baseline["Benchmarks"].get(name, {})
+        ratio = row["Seconds"] / base["Seconds"] if base.get("Seconds") else float("nan")
+        print(f"{name:<26}{row['Seconds']:>12.4f}{base.get('Seconds', float('nan')):>12.4f}{ratio:>8.2f}"
+              f"{row['PeakMB'] or 0:>10.2f}{base.get('PeakMB') or 0:>10.2f}{row['ApiCalls']:>8}{base.get('ApiCalls', 0):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AwsRds against a synthetic RDS fleet.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--instances", type=int)
+    parser.add_argument("--clusters", type=int)
+    parser.add_argument("--snapshots", type=int)
+    parser.add_argument("--log-mb", type=int)
+    parser.add_argument("--only", nargs="*", help="Only run these benchmarks")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak memory run")
+    parser.add_argument("--out", help="Save the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with the results of a previous run")
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    for key, val in (("Instances", args.instances), ("Clusters", args.clusters), ("Snapshots", args.snapshots), ("LogMB", args.log_mb)):
+        if val is not None:
+            scale[key] = val
+
+    backend = SyntheticRds(**scale)
+    results = {"Date": datetime.now().isoformat(timespec="seconds"), "Scale": scale, "Benchmarks": {}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, func in Benchmarks(backend, tmp).items():
+            if args.only and name not in args.only:
+                continue
+
+            row = results["Benchmarks"][name] = Measure(backend, name, func, not args.no_memory)
+            print(f"{name:<26}{row['Seconds']:>10.4f}s  {row['PeakMB'] or 0:>8.2f} MB  {row['ApiCalls']:>7} calls  {row['Calls']}", flush=True)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            Compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from AwsRds import AwsRds
+
+
+class AsyncAwsRds:
+    '''
+    Asyncio variant of AwsRds.
+
+    Every public AwsRds method listed in _METHODS is available as a coroutine with the
+    same parameters. boto3 is blocking, so calls run on a thread pool of Concurrency
+    workers shared by every call: hundreds of calls can be awaited at once while only
+    Concurrency of them use a thread, the rest wait in the queue. All calls share the
+    inventory cache of the wrapped AwsRds.
+    '''
+
+    _METHODS = (
+        "AddEnvTag",
+        "AddTags",
+        "AggregateSlowQueries",
+        "DelEnvTag",
+        "DownloadLogs",
+        "DownloadSlowQueries",
+        "Exists",
+        "GetInstance",
+        "GetInstanceByTag",
+        "GetInstanceCluster",
+        "GetInstanceClusters",
+        "GetModifiedLogs",
+        "GetResourceTags",
+        "GetSnapshotByInstance",
+        "GetTopSnapshot",
+        "HarvestLogs",
+        "InstanceAction",
+        "InstancesAction",
+        "MonitorLogs",
+        "PollEvents",
+        "RefreshCache",
+        "RemoveTags",
+        "ShipLogToS3",
+        "SnapshotExists",
+        "Status",
+        "SyncLogs",
+        "UploadToS3",
+    )
+
+    def __init__(self,Profile="default",Region="us-east-1",CacheTTL: int = 60,Concurrency: int = 50,Store: str = None):
+        self.rds = AwsRds(Profile, Region, CacheTTL, MaxWorkers=Concurrency, Store=Store)
+        self.concurrency = Concurrency
+        self._pool = ThreadPoolExecutor(max_workers=Concurrency, thread_name_prefix="AsyncAwsRds")
+
+    async def _Call(self,Method: str,*args,**kwargs):
+        '''
+        Run an AwsRds method on the thread pool.
+
+        Parameters:
+            Method - AwsRds method name.
+            args, kwargs - Parameters of the method.
+
+        Returns
+            The method return value
+        '''
+
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(self._pool, functools.partial(getattr(self.rds, Method), *args, **kwargs))
+
+    def InvalidateCache(self,Kind: str = "ALL"):
+        '''
+        Drop the cached inventory so the next call describes again.
+        '''
+
+        self.rds.InvalidateCache(Kind)
+
+    def Close(self):
+        '''
+        Shut down the thread pool.
+        '''
+
+        self._pool.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self,*exc):
+        self._pool.shutdown(wait=False)
+
+
+def _Mirror(Name: str):
+    '''
+    Build the coroutine of an AwsRds method.
+    '''
+
+    @functools.wraps(getattr(AwsRds, Name))
+    async def method(self,*args,**kwargs):
+        return await self._Call(Name, *args, **kwargs)
+
+    return method
+
+
+for _name in AsyncAwsRds._METHODS:
+    setattr(AsyncAwsRds, _name, _Mirror(_name))
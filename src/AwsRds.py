@@ -1,18 +1,616 @@
 import sys
 import boto3
+from botocore.config import Config
 import time
 import os
+import gzip
+import json
+import inspect
+import threading
+import re
+import zlib
+import heapq
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime
 from datetime import timedelta
+from datetime import timezone
+from PgLogParser import ParseSlowQueries, SlowQueryStats, LogParser, ParseRecords
+from RdsInstrumentation import Instrumentation
+from RdsRateLimiter import RateLimiter
+from RdsRecords import InstanceInfo, ClusterInfo, SnapshotInfo, LogFileInfo
+from RdsInventoryStore import InventoryStore
+import RdsLogSearch
+from RdsLogMetrics import LogMonitor, WINDOWS
 
 
 class AwsRds:
 
-    def __init__(self,Profile="default",Region="us-east-1"):       
+    #INVENTORY KINDS -> (DESCRIBE CALL, RESPONSE KEY, IDENTIFIER KEY, SINGLE LOOKUP PARAMETER, ARN KEY)
+    _INVENTORY = {
+        "instances": ("describe_db_instances", "DBInstances", "DBInstanceIdentifier", "DBInstanceIdentifier", "DBInstanceArn"),
+        "clusters": ("describe_db_clusters", "DBClusters", "DBClusterIdentifier", "DBClusterIdentifier", "DBClusterArn"),
+    }
+
+    #EVENT SOURCE TYPE -> INVENTORY KIND
+    _EVENT_KINDS = {
+        "db-instance": "instances",
+        "db-cluster": "clusters",
+        "db-cluster-snapshot": "snapshots",
+    }
+
+    #SECONDS EACH EVENTS POLL REACHES BACK BEFORE THE LAST ONE, EVENTS SHOW UP WITH A DELAY
+    _EVENT_OVERLAP = 60
+
+    def __init__(self,Profile="default",Region="us-east-1",CacheTTL: int = 60,MaxWorkers: int = 10,Instrument: bool = False,RateLimits = None,Store: str = None,StoreTTL: int = 300,TrackEvents: bool = False,RelistTTL: int = 3600):
         self.profile = Profile
         self.region = Region
-        self.session = boto3.Session(profile_name=Profile, region_name=Region)
-        self.rds = self.session.client('rds')
+        self.cache_ttl = CacheTTL
+        self.max_workers = MaxWorkers
+        self._cache = {}
+        self._cache_lock = threading.RLock()
+        self._session = None
+        self._clients = {}
+        self._client_lock = threading.Lock()
+        self.instrumentation = None
+        #True = DEFAULT LIMITS, dict = {family: rate or (rate, burst)}
+        self.rate_limiter = RateLimiter(None if RateLimits is True else RateLimits) if RateLimits else None
+        #SQLITE FILE SHARED BY EVERY RUN, ROWS ARE KEPT PER PROFILE/REGION
+        self.store = InventoryStore(Store, f"{Profile}/{Region}") if Store else None
+        self.store_ttl = StoreTTL
+        #KEEP THE CACHE UP TO DATE WITH describe_events, LIST AGAIN EVERY RelistTTL SECONDS
+        self.track_events = TrackEvents
+        self.relist_ttl = RelistTTL
+        self._listed = {}
+        self._events_since = None
+        self._events_seen = set()
+
+        if Instrument:
+            self._Instrument()
+
+    def _Instrument(self):
+        '''
+        Record API calls and method latency, see RdsInstrumentation.
+
+        Only called when Instrument=True, so an uninstrumented AwsRds has no hooks at all.
+        '''
+
+        self.instrumentation = Instrumentation()
+
+        #WRAP THE PUBLIC METHODS ON THIS OBJECT ONLY, LAZY RESULTS ARE TIMED WHILE CONSUMED
+        for name, fn in inspect.getmembers(type(self), inspect.isfunction):
+            if name[0].isupper() and name != "Client":
+                setattr(self, name, self.instrumentation.Wrap(name, getattr(self, name)))
+
+        for client in self._clients.values():
+            self.instrumentation.Register(client)
+
+    ####################################################################################################
+    ##  CLIENTS
+    ####################################################################################################
+
+    @property
+    def session(self):
+        '''
+        boto3 Session of the profile and region, created on first use.
+        '''
+
+        if self._session is None:
+            with self._client_lock:
+                if self._session is None:
+                    self._session = boto3.Session(profile_name=self.profile, region_name=self.region)
+
+        return self._session
+
+    @property
+    def rds(self):
+        '''
+        RDS client, created on first use.
+        '''
+
+        return self._clients.get('rds') or self.Client('rds')
+
+    def Client(self,Service: str):
+        '''
+        Get the client of an AWS service, created on first use and reused by every later call.
+
+        The client connection pool holds at least MaxWorkers connections so threaded calls
+        share warm connections, and retries use the adaptive mode.
+
+        Parameters:
+            Service - AWS service name (rds, s3...).
+
+        Returns
+            boto3 client
+        '''
+
+        client = self._clients.get(Service)
+
+        if client is None:
+            session = self.session
+
+            #boto3 CLIENT CREATION IS NOT THREAD SAFE
+            with self._client_lock:
+                client = self._clients.get(Service)
+                if client is None:
+                    config = Config(
+                        max_pool_connections=max(self.max_workers * 2, 10),
+                        retries={"mode": "adaptive", "max_attempts": 10},
+                    )
+                    client = session.client(Service, config=config)
+                    if self.instrumentation is not None:
+                        self.instrumentation.Register(client)
+                    if self.rate_limiter is not None and Service == 'rds':
+                        self.rate_limiter.Register(client)
+                    self._clients[Service] = client
+
+        return client
+
+    ####################################################################################################
+    ##  INVENTORY CACHE
+    ####################################################################################################
+
+    def _Inventory(self,Kind: str,Refresh: bool = False):
+        '''
+        Get the cached inventory for a resource kind, describing it again when stale.
+
+        Parameters:
+            Kind - instances or clusters.
+            Refresh - Ignore the cache and describe again.
+
+        Returns
+            dict of identifier -> describe entry
+        '''
+
+        return self._InventoryEntry(Kind, Refresh)[1]
+
+    def _InventoryEntry(self,Kind: str,Refresh: bool = False):
+        '''
+        Get the cache entry for a resource kind, describing it again when stale.
+
+        Parameters:
+            Kind - instances or clusters.
+            Refresh - Ignore the cache and describe again.
+
+        Returns
+            (loaded time, dict of identifier -> describe entry, dict of indexes)
+        '''
+
+        with self._cache_lock:
+            entry = self._cache.get(Kind)
+
+            #A TRACKED INVENTORY IS BROUGHT UP TO DATE BY ONE EVENTS CALL INSTEAD OF LISTING AGAIN
+            if not Refresh and entry is not None and (time.monotonic() - entry[0]) >= self.cache_ttl and self._Tracked(Kind):
+                if self.PollEvents() is not None:
+                    entry = self._cache[Kind]
+
+            if Refresh or entry is None or (time.monotonic() - entry[0]) >= self.cache_ttl:
+                call, key, ident, _, arn = self._INVENTORY[Kind]
+                start = datetime.now(timezone.utc)
+                age = self.store.Age(Kind) if self.store is not None and not Refresh else None
+
+                if age is not None and age < (self.relist_ttl if self.track_events else self.store_ttl):
+                    #WARM START FROM THE LISTING OF AN EARLIER RUN
+                    entry = (time.monotonic(), self.store.Load(Kind), {})
+                else:
+                    age = 0
+                    entry = (time.monotonic(), {}, {})
+
+                    for item in self._Paginate(call, key):
+                        entry[1][item[ident]] = item
+
+                    #OLDER API RESPONSES DO NOT CARRY THE TAGS
+                    missing = [item[arn] for item in entry[1].values() if 'TagList' not in item]
+                    if missing:
+                        tags = self.GetResourceTags(missing)
+                        for item in entry[1].values():
+                            if 'TagList' not in item:
+                                item['TagList'] = tags.get(item[arn], [])
+
+                    if self.store is not None:
+                        self.store.Replace(Kind, entry[1])
+
+                for item in entry[1].values():
+                    self._IndexItem(Kind, entry[2], item)
+
+                self._cache[Kind] = entry
+
+                if self.track_events:
+                    #EVENTS ARE APPLIED FROM THE TIME OF THE LISTING
+                    self._listed[Kind] = time.monotonic() - age
+                    if self._events_since is None or start - timedelta(seconds=age) < self._events_since:
+                        self._events_since = start - timedelta(seconds=age)
+
+                    #A STORED LISTING OLDER THAN CacheTTL CATCHES UP WITH THE EVENTS SINCE
+                    if age >= self.cache_ttl and self.PollEvents() is not None:
+                        entry = self._cache[Kind]
+
+            return entry
+
+    def _IndexItem(self,Kind: str,Indexes: dict,Item: dict,Remove: bool = False):
+        '''
+        Add or remove a describe entry from the inventory indexes.
+
+        Parameters:
+            Kind - instances or clusters.
+            Indexes - The indexes of the cache entry.
+            Item - describe entry.
+            Remove - Remove the entry instead of adding it.
+
+        Returns
+            Nothing
+        '''
+
+        ident = self._INVENTORY[Kind][2]
+
+        #TAG KEY -> TAG VALUE -> IDENTIFIERS
+        tags = Indexes.setdefault("tags", {})
+        for tag in Item.get('TagList', []):
+            names = tags.setdefault(tag['Key'], {}).setdefault(tag['Value'], [])
+            if Remove:
+                if Item[ident] in names:
+                    names.remove(Item[ident])
+            else:
+                names.append(Item[ident])
+
+        if Kind == "clusters":
+            #INSTANCE -> CLUSTER
+            members = Indexes.setdefault("members", {})
+            for mem in Item.get('DBClusterMembers', []):
+                if Remove:
+                    if members.get(mem['DBInstanceIdentifier']) == Item['DBClusterIdentifier']:
+                        del members[mem['DBInstanceIdentifier']]
+                else:
+                    members[mem['DBInstanceIdentifier']] = Item['DBClusterIdentifier']
+
+    def _PatchInventoryMany(self,Kind: str,Names: list):
+        '''
+        Describe many instances or clusters with one filtered call and update them in the cache.
+
+        Parameters:
+            Kind - instances or clusters.
+            Names - RDS instance or cluster names.
+
+        Returns
+            dict of name -> describe entry, None if it no longer exists
+        '''
+
+        call, key, ident, _, _ = self._INVENTORY[Kind]
+        filt = "db-cluster-id" if Kind == "clusters" else "db-instance-id"
+        Names = list(Names)
+        found = dict.fromkeys(Names)
+
+        #A FILTER TAKES UP TO 100 VALUES
+        for x in range(0, len(Names), 100):
+            for item in self._Paginate(call, key, Filters=[{"Name": filt, "Values": Names[x:x + 100]}]):
+                found[item[ident]] = item
+
+        for name, item in found.items():
+            self._StoreItem(Kind, name, item)
+
+        return found
+
+    def _StoreItem(self,Kind: str,Name: str,Item: dict):
+        '''
+        Replace an entry of the cache and its indexes.
+
+        Parameters:
+            Kind - instances or clusters.
+            Name - RDS instance or cluster name.
+            Item - describe entry, None to remove it.
+
+        Returns
+            Nothing
+        '''
+
+        with self._cache_lock:
+            entry = self._cache.get(Kind)
+            if entry is not None:
+                old = entry[1].pop(Name, None)
+                if old is not None:
+                    self._IndexItem(Kind, entry[2], old, Remove=True)
+                if Item is not None:
+                    #KEEP THE KNOWN TAGS WHEN THE RESPONSE HAS NONE
+                    if 'TagList' not in Item:
+                        Item['TagList'] = old.get('TagList', []) if old else []
+                    entry[1][Name] = Item
+                    self._IndexItem(Kind, entry[2], Item)
+
+            if self.store is not None:
+                if Item is None or 'TagList' in Item:
+                    self.store.Put(Kind, Name, Item)
+                else:
+                    #THE STORED TAGS WOULD BE LOST, LIST AGAIN NEXT TIME
+                    self.store.Invalidate(Kind)
+
+    def InvalidateCache(self,Kind: str = "ALL"):
+        '''
+        Drop the cached inventory so the next call describes again.
+
+        Parameters:
+            Kind - instances, clusters, snapshots (Store only) or ALL (default: ALL).
+
+        Returns
+            Nothing
+        '''
+
+        with self._cache_lock:
+            if str(Kind).lower() == "all":
+                self._cache.clear()
+            else:
+                self._cache.pop(Kind, None)
+
+            if self.store is not None:
+                self.store.Invalidate(Kind)
+
+    def RefreshCache(self,Kind: str = "ALL"):
+        '''
+        Force a refresh of the cached inventory.
+
+        Parameters:
+            Kind - instances, clusters, snapshots (Store only) or ALL (default: ALL, snapshots are not included).
+
+        Returns
+            Nothing
+        '''
+
+        if Kind == "snapshots":
+            if self.store is None:
+                raise ValueError("Snapshots are only cached in a Store, create AwsRds with Store= to refresh them")
+            self._StoredSnapshots(Refresh=True)
+            return
+
+        kinds = list(self._INVENTORY) if str(Kind).lower() == "all" else [Kind]
+
+        for kind in kinds:
+            self._Inventory(kind, Refresh=True)
+
+    def _Stored(self,Kind: str):
+        '''
+        Get the inventory store when it should answer a query instead of the cache.
+
+        That is when a Store is configured, the cache of this run is empty or stale and
+        the store was listed less than StoreTTL seconds ago.
+
+        Parameters:
+            Kind - instances or clusters.
+
+        Returns
+            InventoryStore or None
+        '''
+
+        if self.store is None:
+            return None
+
+        with self._cache_lock:
+            entry = self._cache.get(Kind)
+            if entry is not None and (time.monotonic() - entry[0]) < self.cache_ttl:
+                return None
+
+        #A TRACKED STORE IS ONLY ANSWERED FROM DIRECTLY UNTIL IT NEEDS AN EVENTS POLL
+        maxage = min(self.store_ttl, self.cache_ttl) if self.track_events else self.store_ttl
+
+        return self.store if self.store.Fresh(Kind, maxage) else None
+
+    def _StoredSnapshots(self,Refresh: bool = False):
+        '''
+        Get the inventory store with the cluster snapshots listed less than StoreTTL seconds ago.
+
+        Parameters:
+            Refresh - List the snapshots again even if the store is fresh.
+
+        Returns
+            InventoryStore
+        '''
+
+        if Refresh or not self.store.Fresh("snapshots", self.store_ttl):
+            self.store.ReplaceSnapshots(self.IterClusterSnapshots(Records=True))
+
+        return self.store
+
+    def GetResourceTags(self,Arns: list,Workers: int = None):
+        '''
+        Get the tags of many RDS resources (clusters, snapshots...) concurrently.
+
+        Parameters:
+            Arns - list of RDS resource ARNs.
+            Workers - Maximum concurrent list_tags_for_resource calls (default: MaxWorkers).
+
+        Returns
+            dict of ARN -> TagList
+        '''
+
+        def tags(arn):
+            return self.rds.list_tags_for_resource(ResourceName=arn)['TagList']
+
+        arns = list(dict.fromkeys(Arns))
+
+        with ThreadPoolExecutor(max_workers=Workers or self.max_workers) as pool:
+            return dict(zip(arns, pool.map(tags, arns)))
+
+    ####################################################################################################
+    ##  EVENTS
+    ####################################################################################################
+
+    def _Tracked(self,Kind: str):
+        '''
+        Check if a cached kind can be brought up to date with events instead of listing it again.
+        '''
+
+        return self.track_events and Kind in self._listed and (time.monotonic() - self._listed[Kind]) < self.relist_ttl
+
+    def PollEvents(self):
+        '''
+        Apply the RDS events since the last poll to the cached inventory.
+
+        Every instance, cluster or cluster snapshot named by an event (state changes,
+        creations, deletions, failovers...) is described again with one filtered call per
+        kind and patched in the cache and the Store, the other entries are kept. The cluster
+        of an instance is patched with it so the cluster members stay right, even when only
+        the clusters are cached.
+        Called by the cache every CacheTTL seconds when created with TrackEvents=True.
+
+        Returns
+            list of describe_events entries applied, None when there is no listing to apply them to (or it is older than the 14 days of events RDS keeps)
+        '''
+
+        with self._cache_lock:
+            now = datetime.now(timezone.utc)
+            since = self._events_since
+
+            if since is None or now - since > timedelta(days=14, seconds=-self._EVENT_OVERLAP):
+                return None
+
+            names = {kind: set() for kind in self._EVENT_KINDS.values()}
+            events = []
+            seen = set()
+
+            for event in self._Paginate("describe_events", "Events", StartTime=since - timedelta(seconds=self._EVENT_OVERLAP), EndTime=now):
+                kind = self._EVENT_KINDS.get(event.get('SourceType'))
+                ev_key = (event.get('SourceType'), event.get('SourceIdentifier'), event.get('Date'), event.get('Message'))
+                seen.add(ev_key)
+
+                #THE OVERLAP RETURNS THE LAST EVENTS OF THE PREVIOUS POLL AGAIN
+                if kind is None or ev_key in self._events_seen:
+                    continue
+
+                names[kind].add(event['SourceIdentifier'])
+                events.append(event)
+
+            #THE CLUSTERS OF THE INSTANCES ARE PATCHED EVEN WHEN THE INSTANCES ARE NOT CACHED
+            if names["instances"] and ("instances" in self._cache or "clusters" in self._cache or self.store is not None):
+                old = self._cache.get("instances", (0, {}, {}))[1]
+                members = self._cache.get("clusters", (0, {}, {}))[2].get("members", {})
+                clusters = {old[name].get('DBClusterIdentifier') for name in names["instances"] if name in old}
+                #A DELETED INSTANCE THAT WAS NOT CACHED IS FOUND THROUGH THE CLUSTER MEMBERS
+                clusters.update(members.get(name) for name in names["instances"])
+                found = self._PatchInventoryMany("instances", names["instances"])
+                clusters.update(item.get('DBClusterIdentifier') for item in found.values() if item)
+                names["clusters"].update(clusters - {None})
+
+            if names["clusters"] and ("clusters" in self._cache or self.store is not None):
+                self._PatchInventoryMany("clusters", names["clusters"])
+
+            if names["snapshots"] and self.store is not None and self.store.Age("snapshots") is not None:
+                self._PatchSnapshots(names["snapshots"])
+
+            self._events_since = now
+            self._events_seen = seen
+
+            #EVERY CACHED KIND IS UP TO DATE AS OF NOW
+            for kind, entry in list(self._cache.items()):
+                self._cache[kind] = (time.monotonic(), entry[1], entry[2])
+
+            return events
+
+    def _PatchSnapshots(self,Names: set):
+        '''
+        Describe cluster snapshots one by one and update them in the Store.
+
+        Parameters:
+            Names - RDS cluster snapshot names.
+
+        Returns
+            Nothing
+        '''
+
+        for name in Names:
+            try:
+                data = self.rds.describe_db_cluster_snapshots(DBClusterSnapshotIdentifier=name)['DBClusterSnapshots']
+                snap = SnapshotInfo.FromDescribe(data[0]) if data else None
+            except self.rds.exceptions.DBClusterSnapshotNotFoundFault:
+                snap = None
+
+            self.store.PutSnapshot(name, snap)
+
+    ####################################################################################################
+    ##  PAGINATION
+    ####################################################################################################
+
+    def _Paginate(self,Operation: str,Key: str,**kwargs):
+        '''
+        Follow the Marker of a describe call page by page.
+
+        Parameters:
+            Operation - RDS client operation name.
+            Key - Response key holding the items.
+            kwargs - Parameters passed to the operation.
+
+        Returns
+            Generator of items
+        '''
+
+        paginator = self.rds.get_paginator(Operation)
+
+        for page in paginator.paginate(**kwargs):
+            yield from page.get(Key, [])
+
+    def IterInstances(self,Records: bool = False):
+        '''
+        Iterate over every RDS instance.
+
+        Parameters:
+            Records - Return InstanceInfo records instead of describe entries (default: False).
+
+        Returns
+            Generator of describe_db_instances entries or InstanceInfo
+        '''
+
+        items = self._Paginate("describe_db_instances", "DBInstances")
+
+        return map(InstanceInfo.FromDescribe, items) if Records else items
+
+    def IterClusters(self,Records: bool = False):
+        '''
+        Iterate over every RDS cluster.
+
+        Parameters:
+            Records - Return ClusterInfo records instead of describe entries (default: False).
+
+        Returns
+            Generator of describe_db_clusters entries or ClusterInfo
+        '''
+
+        items = self._Paginate("describe_db_clusters", "DBClusters")
+
+        return map(ClusterInfo.FromDescribe, items) if Records else items
+
+    def IterClusterSnapshots(self,Cluster: str = None,Records: bool = False):
+        '''
+        Iterate over RDS cluster snapshots.
+
+        Parameters:
+            Cluster - RDS cluster name (default: all clusters).
+            Records - Return SnapshotInfo records instead of describe entries (default: False).
+
+        Returns
+            Generator of describe_db_cluster_snapshots entries or SnapshotInfo
+        '''
+
+        if Cluster:
+            items = self._Paginate("describe_db_cluster_snapshots", "DBClusterSnapshots", DBClusterIdentifier=Cluster)
+        else:
+            items = self._Paginate("describe_db_cluster_snapshots", "DBClusterSnapshots")
+
+        return map(SnapshotInfo.FromDescribe, items) if Records else items
+
+    def IterLogFiles(self,Instance: str,Since: int = 0,Records: bool = False):
+        '''
+        Iterate over the log files of an RDS instance.
+
+        Parameters:
+            Instance - RDS instance name.
+            Since - Only files written after this epoch time in milliseconds (default: 0).
+            Records - Return LogFileInfo records instead of describe entries (default: False).
+
+        Returns
+            Generator of describe_db_log_files entries or LogFileInfo
+        '''
+
+        items = self._Paginate("describe_db_log_files", "DescribeDBLogFiles", DBInstanceIdentifier=Instance, FileLastWritten=int(Since))
+
+        return map(LogFileInfo.FromDescribe, items) if Records else items
 
     def GetInstance(self,Engine:str = "aurora-postgresql",Active: bool = False,RetOut: bool = False):
         '''
@@ -23,90 +621,564 @@ class AwsRds:
             Active - Check for only available instances True/False.  
             RetOut - Standard Output True/False.  
         Returns
-            Instance Names
+            Instance Names
+        '''
+        
+        valarr = []
+
+        store = self._Stored("instances")
+        if store is not None:
+            data = {}
+            valarr = store.Instances(Engine, "available" if Active else None)
+        else:
+            #Describe DB Instances
+            data = self._Inventory("instances")
+
+        for ins in data.values():
+            if Active:
+                if (ins['Engine'] == Engine) and (ins['DBInstanceStatus'] == "available"):
+                    valarr.append(ins['DBInstanceIdentifier'])
+            else:
+                if (ins['Engine'] == Engine):
+                    valarr.append(ins['DBInstanceIdentifier'])
+
+        retval = valarr
+
+        if RetOut:
+            sys.stdout.write(" ".join(retval))
+
+        return retval
+
+    def GetModifiedLogs(self,Instance,Mins: int = 5,ShowBlankFile: bool = False):
+        '''
+        Will get the RDS log file names that have been modified within a period.
+
+        Parameters:
+            Instance - RDS instance name.
+            Mins - number of mins prior to check (default: 5 mins).
+                Default = 5 (5 mins)
+            ShowBlankFile - Show a file if it is empty.
+                Options are 0 (No) and 1 (Yes).  
+                Default = 0 (No)
+        Returns
+            RDS Log File Name
+        '''  	
+
+        valarr = []
+
+        # CONVERT TIME TO EPOCH/POSIX MILLISECONDS
+        st = datetime.now() - timedelta(minutes=Mins)
+        epoch = time.mktime(st.timetuple())*1e3 + st.microsecond/1e3
+
+        for log in self.IterLogFiles(Instance, epoch):
+            if (ShowBlankFile == False): 
+                if (log['Size'] > 0):
+                    valarr.append(log['LogFileName'])
+            else:
+                valarr.append(log['LogFileName'])
+
+        return valarr
+
+    def IterLogPortions(self,Instance: str,LogFile: str,Marker: str = "0",NumberOfLines: int = None):
+        '''
+        Iterate over a rds log file portion by portion, following the marker until no data is pending.
+
+        Parameters:
+            Instance - RDS instance name.
+            LogFile - RDS log file.
+            Marker - The marker to start from (default: 0, the start of the file).
+            NumberOfLines - Number of lines per portion (default: as many as RDS returns).
+
+        Returns
+            Generator of (LogFileData, Marker) tuples, Marker is where the next portion starts
+        '''
+
+        kwargs = {"DBInstanceIdentifier": Instance, "LogFileName": LogFile}
+        if NumberOfLines:
+            kwargs["NumberOfLines"] = NumberOfLines
+
+        while True:
+            data = self.rds.download_db_log_file_portion(Marker=Marker, **kwargs)
+            Marker = data.get("Marker", Marker)
+
+            yield data.get("LogFileData") or "", Marker
+
+            if not data.get("AdditionalDataPending"):
+                break
+
+    def IterLogRecords(self,Instance: str,LogFile: str,Severities = None):
+        '''
+        Iterate over the records of a RDS PostgreSQL log as it is downloaded.
+
+        Parameters:
+            Instance - RDS instance name.
+            LogFile - RDS log file.
+            Severities - Only keep these severities (default: all).
+                A severity name keeps it and every more severe one, e.g. "ERROR" = ERROR, FATAL and PANIC,
+                a list keeps exactly those, e.g. ["ERROR", "FATAL"].
+
+        Returns
+            Generator of LogRecord(Time, Host, Pid, User, Database, Severity, Message, Lines, Head)
+        '''
+
+        return ParseRecords((data for data, _ in self.IterLogPortions(Instance, LogFile)), Severities)
+
+    def DownloadLogs(self,Instance: str,LogFile: str,DLoc: str,Compress: bool = False,Resume: bool = False,NumberOfLines: int = None,Severities = None):
+        '''
+        Will download a rds log file locally.
+
+        Parameters:
+            Instance - RDS instance name.
+            LogFile - RDS log file.
+            DLoc - The local file location.
+            Compress - Gzip each portion as it is written (default: False).
+            Resume - Continue an interrupted download from its checkpoint (default: False).
+                The checkpoint is kept in DLoc + ".marker" and removed once the download completes.
+            NumberOfLines - Number of lines per portion (default: as many as RDS returns).
+            Severities - Only write the records of these severities, see IterLogRecords (default: all).
+
+        Returns
+            Number of bytes written
+        '''
+
+        checkpoint = DLoc + ".marker"
+        marker = "0"
+        offset = 0
+        parser = LogParser(Severities) if Severities is not None else None
+
+        ####################################################################################################
+        ##  RESUME FROM THE LAST CHECKPOINT
+        ####################################################################################################
+
+        if Resume and os.path.isfile(checkpoint) and os.path.isfile(DLoc):
+            with open(checkpoint) as f:
+                saved = json.load(f)
+
+            if saved.get("LogFile") == LogFile and saved.get("Compress") == Compress and (saved.get("Parser") is None) == (parser is None):
+                marker = saved["Marker"]
+                offset = saved["Offset"]
+                if parser is not None:
+                    parser.Restore(saved["Parser"])
+
+        ####################################################################################################
+        ##  DOWNLOAD LOG PORTION BY PORTION
+        ####################################################################################################
+
+        written, _ = self._AppendLog(Instance, LogFile, DLoc, marker, offset, Compress, NumberOfLines, parser)
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        return written
+
+    def _AppendLog(self,Instance: str,LogFile: str,DLoc: str,Marker: str,Offset: int,Compress: bool,NumberOfLines: int = None,Parser: LogParser = None):
+        '''
+        Download a rds log file from a marker, writing it at an offset of the local file.
+
+        A checkpoint is kept in DLoc + ".marker" after every portion, see DownloadLogs.
+
+        Parameters:
+            Instance - RDS instance name.
+            LogFile - RDS log file.
+            DLoc - The local file location.
+            Marker - The marker to start from.
+            Offset - The local file size at that marker, anything after it is dropped (0 starts a new file).
+            Compress - Gzip each portion as it is written.
+            NumberOfLines - Number of lines per portion (default: as many as RDS returns).
+            Parser - LogParser to filter the data with, its state is kept in the checkpoint (default: None, all data).
+
+        Returns
+            (local file size, marker of the end of the data)
+        '''
+
+        checkpoint = DLoc + ".marker"
+
+        def write(data):
+            chunk = data.encode("utf-8")
+            #EACH PORTION IS ITS OWN GZIP MEMBER SO THE FILE CAN BE CUT AT ANY CHECKPOINT
+            f.write(gzip.compress(chunk) if Compress else chunk)
+            f.flush()
+
+        with open(DLoc, "r+b" if Offset else "wb") as f:
+            #DROP ANYTHING WRITTEN AFTER THE CHECKPOINT
+            f.seek(Offset)
+            f.truncate()
+
+            for data, Marker in self.IterLogPortions(Instance, LogFile, Marker, NumberOfLines):
+                if data:
+                    kept = Parser.FilterText(data) if Parser is not None else data
+                    if kept:
+                        write(kept)
+
+                    tmp = checkpoint + ".tmp"
+                    with open(tmp, "w") as cp:
+                        json.dump({"LogFile": LogFile, "Marker": Marker, "Offset": f.tell(), "Compress": Compress,
+                                   "Parser": Parser.State() if Parser is not None else None}, cp)
+                    os.replace(tmp, checkpoint)
+
+            #LAST LINE WITHOUT A NEW LINE
+            if Parser is not None:
+                kept = Parser.FlushText()
+                if kept:
+                    write(kept)
+
+            return f.tell(), Marker
+
+    def HarvestLogs(self,Instances: list,Mins: int,DLoc: str,Workers: int = None,PerInstance: int = 2,ShowBlankFile: bool = False,Compress: bool = False):
+        '''
+        Download the modified log files of many RDS instances concurrently.
+
+        Parameters:
+            Instances - list of RDS instance names.
+            Mins - number of mins prior to check, as in GetModifiedLogs.
+            DLoc - The local directory, files are saved to DLoc/Instance/LogFile.
+            Workers - Maximum concurrent downloads (default: MaxWorkers).
+            PerInstance - Maximum concurrent downloads from a single instance (default: 2).
+            ShowBlankFile - Download empty files as well (default: False).
+            Compress - Gzip the files as they are written (default: False).
+
+        Returns
+            Manifest: {Files: [{Instance, LogFile, DLoc, Bytes, Seconds, Error}], Bytes, Seconds, Failures}
         '''
-        
-        valarr = []
 
-        #Describe DB Instances
-        data = self.rds.describe_db_instances()
+        start = time.monotonic()
+        workers = Workers or self.max_workers
+        files = []
 
-        cnt=len(data['DBInstances'])
+        ####################################################################################################
+        ##  LIST THE MODIFIED LOGS OF EVERY INSTANCE
+        ####################################################################################################
 
-        for x in range(cnt):
-            if Active:
-                if (data['DBInstances'][x]['Engine'] == Engine) and (data['DBInstances'][x]['DBInstanceStatus'] == "available"):
-                    valarr.append(data['DBInstances'][x]['DBInstanceIdentifier'])
-            else:
-                if (data['DBInstances'][x]['Engine'] == Engine):
-                    valarr.append(data['DBInstances'][x]['DBInstanceIdentifier'])
+        def listlogs(ins):
+            try:
+                return ins, self.GetModifiedLogs(ins, Mins, ShowBlankFile), None
+            except Exception as e:
+                return ins, [], e
 
-        retval = valarr
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            listed = list(pool.map(listlogs, Instances))
 
-        if RetOut:
-            sys.stdout.write(" ".join(retval))
+        for ins, logs, err in listed:
+            if err is not None:
+                files.append({"Instance": ins, "LogFile": None, "DLoc": None, "Bytes": 0, "Seconds": 0.0, "Error": str(err)})
 
-        return retval
+        ####################################################################################################
+        ##  DOWNLOAD ROUND ROBIN ACROSS INSTANCES
+        ####################################################################################################
 
-    def GetModifiedLogs(self,Instance,Mins: int = 5,ShowBlankFile: bool = False):
+        limits = {ins: threading.BoundedSemaphore(PerInstance) for ins, _, _ in listed}
+
+        def download(ins, log):
+            dest = os.path.join(DLoc, ins, log + (".gz" if Compress else ""))
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+            with limits[ins]:
+                st = time.monotonic()
+                try:
+                    written = self.DownloadLogs(ins, log, dest, Compress=Compress)
+                    err = None
+                except Exception as e:
+                    written = 0
+                    err = str(e)
+
+            return {"Instance": ins, "LogFile": log, "DLoc": dest, "Bytes": written, "Seconds": round(time.monotonic() - st, 3), "Error": err}
+
+        queue = []
+        depth = max([len(logs) for _, logs, _ in listed] or [0])
+        for x in range(depth):
+            for ins, logs, _ in listed:
+                if x < len(logs):
+                    queue.append((ins, logs[x]))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            files.extend(pool.map(lambda job: download(*job), queue))
+
+        return {
+            "Files": files,
+            "Bytes": sum(f["Bytes"] for f in files),
+            "Seconds": round(time.monotonic() - start, 3),
+            "Failures": [f for f in files if f["Error"] is not None],
+        }
+
+    def SyncLogs(self,Instances: list,DLoc: str,Workers: int = None,PerInstance: int = 2,Compress: bool = False,Retention: float = None,Prune: bool = True):
         '''
-        Will get the RDS log file names that have been modified within a period.
+        Keep a local mirror of the log files of many RDS instances.
+
+        A manifest of every file's LastWritten, Size and end marker is kept in
+        DLoc/Instance/.manifest.json. Each run lists the log files of every instance once,
+        downloads the new files, appends only the grown tail of the changed ones and skips
+        the rest, so a run where nothing changed costs one listing per instance.
 
         Parameters:
-            Instance - RDS instance name.
-            Mins - number of mins prior to check (default: 5 mins).
-                Default = 5 (5 mins)
-            ShowBlankFile - Show a file if it is empty.
-                Options are 0 (No) and 1 (Yes).  
-                Default = 0 (No)
+            Instances - list of RDS instance names.
+            DLoc - The local directory, files are saved to DLoc/Instance/LogFile.
+            Workers - Maximum concurrent downloads (default: MaxWorkers).
+            PerInstance - Maximum concurrent downloads from a single instance (default: 2).
+            Compress - Gzip the files as they are written (default: False).
+            Retention - Hours a local file is kept after it was last written (default: as long as RDS lists it).
+            Prune - Delete the local files RDS no longer lists or that are outside the Retention (default: True).
+                Changing Compress always downloads the files again and replaces the old copies.
+
         Returns
-            RDS Log File Name
-        '''  	
+            Manifest: {Files: [{Instance, LogFile, DLoc, Action, Bytes, Seconds, Error}], Skipped, Pruned, Bytes, Seconds, Failures}
+        '''
 
-        valarr = []
+        start = time.monotonic()
+        workers = Workers or self.max_workers
+        cutoff = (time.time() - Retention * 3600) * 1000 if Retention is not None else None
+        files = []
+        pruned = []
+        skipped = 0
 
-        # CONVERT TIME TO EPOCH/POSIX MILLISECONDS
-        st = datetime.now() - timedelta(minutes=Mins)
-        epoch = time.mktime(st.timetuple())*1e3 + st.microsecond/1e3
+        ####################################################################################################
+        ##  LIST THE LOGS OF EVERY INSTANCE
+        ####################################################################################################
 
-        data = self.rds.describe_db_log_files(
-            DBInstanceIdentifier=Instance,
-            FileLastWritten=int(epoch)
-            )
+        def listlogs(ins):
+            try:
+                return ins, list(self.IterLogFiles(ins, Records=True)), None
+            except Exception as e:
+                return ins, None, e
 
-        cnt=len(data['DescribeDBLogFiles'])	
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            listed = list(pool.map(listlogs, Instances))
 
-        for x in range(cnt):
-            if (ShowBlankFile == False): 
-                if (data['DescribeDBLogFiles'][x]['Size'] > 0):
-                    valarr.append(data['DescribeDBLogFiles'][x]['LogFileName'])
-            else:
-                valarr.append(data['DescribeDBLogFiles'][x]['LogFileName'])
+        ####################################################################################################
+        ##  COMPARE WITH THE MANIFEST AND PRUNE
+        ####################################################################################################
 
-        return valarr
+        manifests = {}
+        locks = {}
+        jobs = {}
+
+        for ins, logs, err in listed:
+            if err is not None:
+                files.append({"Instance": ins, "LogFile": None, "DLoc": None, "Action": None, "Bytes": 0, "Seconds": 0.0, "Error": str(err)})
+                continue
+
+            path = os.path.join(DLoc, ins, ".manifest.json")
+            manifest = {}
+            if os.path.isfile(path):
+                with open(path) as f:
+                    manifest = json.load(f).get("LogFiles", {})
+
+            manifests[ins] = manifest
+            locks[ins] = threading.Lock()
+            jobs[ins] = []
+            current = {log.Name: log for log in logs if cutoff is None or log.LastWritten >= cutoff}
+
+            #GONE FROM RDS OR OUTSIDE THE RETENTION
+            for name in list(manifest):
+                if Prune and name not in current and (cutoff is None or manifest[name]["LastWritten"] < cutoff):
+                    dest = os.path.join(DLoc, ins, manifest.pop(name)["File"])
+                    for old in (dest, dest + ".marker"):
+                        if os.path.exists(old):
+                            os.remove(old)
+                    pruned.append(dest)
+
+            for name, log in current.items():
+                saved = manifest.get(name)
+                dest = os.path.join(DLoc, ins, name + (".gz" if Compress else ""))
+
+                if saved is None or saved.get("Compress") != Compress or log.Size < saved["Size"] or not os.path.isfile(dest) or os.path.getsize(dest) < saved["Offset"]:
+                    #REWRITTEN, COMPRESSION CHANGED OR THE LOCAL FILE IS GONE, DOWNLOAD IT AGAIN
+                    if saved is not None and os.path.join(DLoc, ins, saved["File"]) != dest and os.path.exists(os.path.join(DLoc, ins, saved["File"])):
+                        os.remove(os.path.join(DLoc, ins, saved["File"]))
+                    jobs[ins].append((log, dest, "new" if saved is None else "download"))
+                elif log.Size != saved["Size"] or log.LastWritten != saved["LastWritten"]:
+                    jobs[ins].append((log, dest, "append"))
+                else:
+                    skipped += 1
+
+        def save(ins):
+            path = os.path.join(DLoc, ins, ".manifest.json")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"LogFiles": manifests[ins]}, f, indent=1, sort_keys=True)
+            os.replace(tmp, path)
+
+        for ins in manifests:
+            save(ins)
+
+        ####################################################################################################
+        ##  DOWNLOAD ROUND ROBIN ACROSS INSTANCES
+        ####################################################################################################
 
-    def DownloadLogs(self,Instance: str,LogFile: str,DLoc: str):
+        limits = {ins: threading.BoundedSemaphore(PerInstance) for ins in jobs}
+
+        def download(ins, log, dest, action):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            saved = manifests[ins].get(log.Name, {})
+            marker, offset = (saved["Marker"], saved["Offset"]) if action == "append" else ("0", 0)
+
+            #AN INTERRUPTED RUN LEFT A LATER CHECKPOINT
+            if os.path.isfile(dest + ".marker"):
+                with open(dest + ".marker") as f:
+                    cp = json.load(f)
+                if cp.get("LogFile") == log.Name and cp.get("Compress") == Compress and cp["Offset"] > offset:
+                    marker, offset = cp["Marker"], cp["Offset"]
+
+            with limits[ins]:
+                st = time.monotonic()
+                try:
+                    size, marker = self._AppendLog(ins, log.Name, dest, marker, offset, Compress)
+                    written = size - offset
+                    err = None
+
+                    if os.path.exists(dest + ".marker"):
+                        os.remove(dest + ".marker")
+
+                    with locks[ins]:
+                        manifests[ins][log.Name] = {
+                            "File": os.path.relpath(dest, os.path.join(DLoc, ins)),
+                            "LastWritten": log.LastWritten,
+                            "Size": log.Size,
+                            "Marker": marker,
+                            "Offset": size,
+                            "Compress": Compress,
+                        }
+                        save(ins)
+                except Exception as e:
+                    written = 0
+                    err = str(e)
+
+            return {"Instance": ins, "LogFile": log.Name, "DLoc": dest, "Action": action, "Bytes": written, "Seconds": round(time.monotonic() - st, 3), "Error": err}
+
+        queue = []
+        depth = max([len(job) for job in jobs.values()] or [0])
+        for x in range(depth):
+            for ins, job in jobs.items():
+                if x < len(job):
+                    queue.append((ins,) + job[x])
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            files.extend(pool.map(lambda job: download(*job), queue))
+
+        return {
+            "Files": files,
+            "Skipped": skipped,
+            "Pruned": pruned,
+            "Bytes": sum(f["Bytes"] for f in files),
+            "Seconds": round(time.monotonic() - start, 3),
+            "Failures": [f for f in files if f["Error"] is not None],
+        }
+
+    def SearchLogs(self,Instances: list,Pattern: str,Since: datetime,Until: datetime = None,DLoc: str = None,IgnoreCase: bool = False,Workers: int = None,Processes: int = None,ChunkSize: int = 16 * 1024 * 1024,Compress: bool = None):
         '''
-        Will download a rds log file locally.
+        Search the log files of many RDS instances for a regular expression.
+
+        The log files written in the window are downloaded concurrently, split into chunks
+        that start on a log record and searched on a process pool, one chunk per task, so
+        the search scales with the number of cores. Files whose name hour is after Until
+        or that were last written before Since are not downloaded. A log file that cannot be
+        listed or downloaded raises RuntimeError before the search, rather than dropping its matches.
 
         Parameters:
-            Instance - RDS instance name.
-            LogFile - RDS log file.
-            DLoc - The local file location.
+            Instances - list of RDS instance names.
+            Pattern - Regular expression, matched line by line: ^ and $ match at every line and a match cannot run over a new line.
+            Since - Start of the window, naive datetimes are UTC.
+            Until - End of the window (default: now).
+            DLoc - Local mirror directory kept with SyncLogs (default: a temporary directory removed afterwards).
+                The mirror is brought up to date with SyncLogs(Prune=False), a search never deletes a file of it.
+            IgnoreCase - Case insensitive search (default: False).
+            Workers - Maximum concurrent downloads (default: MaxWorkers).
+            Processes - Search processes (default: one per core).
+            ChunkSize - Approximate bytes searched per task (default: 16 MB).
+            Compress - Compress setting of the DLoc mirror, as in SyncLogs (default: the setting the mirror was synced with).
+                A different setting than the mirror's downloads every file again and replaces the old copies.
 
         Returns
-            Nothing
-        '''  		
+            Generator of SearchMatch(Time, Instance, LogFile, Text) in timestamp order
+        '''
 
-        # DOWNLOAD LOG
-        data = self.rds.download_db_log_file_portion(
-            DBInstanceIdentifier=Instance,
-            LogFileName=LogFile
-            )
+        since = RdsLogSearch.Stamp(Since)
+        until = RdsLogSearch.Stamp(Until)
+        flags = re.IGNORECASE if IgnoreCase else 0
+        tmp = None
+        pool = None
+
+        def stream(ins, log, futures):
+            for future in futures:
+                for stamp, text in future.result():
+                    yield RdsLogSearch.SearchMatch(stamp, ins, log, text)
 
-        # OPEN LOGFILE AND OVERWRITE
-        with open(DLoc, "w+") as f:
-            f.write(data.get("LogFileData", ""))
+        try:
+            ####################################################################################################
+            ##  FETCH THE LOG FILES OF THE WINDOW
+            ####################################################################################################
+
+            if DLoc is None:
+                tmp = DLoc = tempfile.mkdtemp(prefix="SearchLogs")
+                epoch = Since.replace(tzinfo=Since.tzinfo or timezone.utc).timestamp() * 1000
+
+                def listlogs(ins):
+                    try:
+                        return [(ins, log) for log in self.IterLogFiles(ins, epoch, Records=True) if RdsLogSearch.InWindow(log.Name, log.LastWritten, since, until)], None
+                    except Exception as e:
+                        return [], {"Instance": ins, "LogFile": None, "Error": str(e)}
+
+                def download(job):
+                    ins, log = job
+                    dest = os.path.join(DLoc, ins, log.Name)
+                    os.makedirs(os.path.dirname(dest), exist_ok=True)
+                    try:
+                        self.DownloadLogs(ins, log.Name, dest)
+                        return (ins, log.Name, dest), None
+                    except Exception as e:
+                        return None, {"Instance": ins, "LogFile": log.Name, "Error": str(e)}
+
+                with ThreadPoolExecutor(max_workers=Workers or self.max_workers) as threads:
+                    listed = list(threads.map(listlogs, Instances))
+                    fetched = list(threads.map(download, [job for logs, _ in listed for job in logs]))
+
+                failures = [err for _, err in listed + fetched if err is not None]
+                files = [file for file, err in fetched if err is None]
+            else:
+                if Compress is None:
+                    Compress = False
+                    for ins in Instances:
+                        path = os.path.join(DLoc, ins, ".manifest.json")
+                        if os.path.isfile(path):
+                            with open(path) as f:
+                                entries = list(json.load(f).get("LogFiles", {}).values())
+                            if entries:
+                                Compress = entries[0].get("Compress", False)
+                                break
+
+                #THE MIRROR ONLY DOWNLOADS WHAT CHANGED SINCE THE LAST SEARCH OR SYNC, A SEARCH NEVER PRUNES IT
+                manifest = self.SyncLogs(Instances, DLoc, Workers=Workers, Compress=Compress, Prune=False)
+                failures = manifest["Failures"]
+                files = []
+
+                for ins in Instances:
+                    path = os.path.join(DLoc, ins, ".manifest.json")
+                    if os.path.isfile(path):
+                        with open(path) as f:
+                            for name, entry in sorted(json.load(f)["LogFiles"].items()):
+                                if RdsLogSearch.InWindow(name, entry["LastWritten"], since, until):
+                                    files.append((ins, name, os.path.join(DLoc, ins, entry["File"])))
+
+            #A MISSING FILE WOULD SILENTLY DROP ITS MATCHES
+            if failures:
+                raise RuntimeError(f"SearchLogs could not fetch {len(failures)} log file(s): " + "; ".join(f"{f['Instance']} {f['LogFile'] or ''}: {f['Error']}" for f in failures[:10]))
+
+            ####################################################################################################
+            ##  SEARCH CHUNKS ON A PROCESS POOL AND MERGE BY TIMESTAMP
+            ####################################################################################################
+
+            pool = ProcessPoolExecutor(max_workers=Processes)
+            streams = []
+            for ins, log, path in files:
+                futures = [pool.submit(RdsLogSearch.SearchChunk, path, start, end, Pattern, flags, since, until) for start, end in RdsLogSearch.Chunks(path, ChunkSize)]
+                streams.append(stream(ins, log, futures))
+
+            yield from heapq.merge(*streams, key=lambda match: match.Time)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            if tmp is not None:
+                shutil.rmtree(tmp, ignore_errors=True)
 
     def UploadToS3(self,FileLoc: str,BucketName: str,DestFileLoc: str):
         '''
@@ -128,32 +1200,298 @@ class AwsRds:
         Nothing
         '''  		
 
-        #LOAD S3 RESOURCE
-        s3 = boto3.resource('s3')
-
         #UPLOAD FILE
-        s3.meta.client.upload_file(FileLoc,BucketName,DestFileLoc)
+        self.Client('s3').upload_file(FileLoc,BucketName,DestFileLoc)
+
+    def ShipLogToS3(self,Instance: str,LogFile: str,BucketName: str,DestFileLoc: str,Compress: bool = False,PartSize: int = 8 * 1024 * 1024,Workers: int = 4):
+        '''
+        Stream a rds log file straight into an S3 multipart upload without a local file.
+
+        Parameters:
+            Instance - RDS instance name.
+            LogFile - RDS log file.
+            BucketName - The s3 bucket name.
+            DestFileLoc - The s3 location and file name.
+            Compress - Gzip the log as it is uploaded (default: False).
+            PartSize - Bytes per uploaded part, at least 5 MB (default: 8 MB).
+            Workers - Parts uploaded at once (default: 4).
+                Memory used is about (Workers + 1) * PartSize.
+
+        Returns
+            {Bucket, Key, Bytes, Parts}
+        '''
+
+        s3 = self.Client('s3')
+        PartSize = max(PartSize, 5 * 1024 * 1024)
+        comp = zlib.compressobj(6, zlib.DEFLATED, 31) if Compress else None
+
+        def stream():
+            for data, _ in self.IterLogPortions(Instance, LogFile):
+                if data:
+                    chunk = data.encode("utf-8")
+                    yield comp.compress(chunk) if comp else chunk
+            if comp:
+                yield comp.flush()
+
+        buffer = bytearray()
+        total = 0
+        upload = None
+        parts = []
+        futures = []
+        slots = threading.BoundedSemaphore(Workers)
+
+        def send(number, body):
+            try:
+                res = s3.upload_part(Bucket=BucketName, Key=DestFileLoc, UploadId=upload, PartNumber=number, Body=body)
+                return {"PartNumber": number, "ETag": res["ETag"]}
+            finally:
+                slots.release()
+
+        def failed():
+            #STOP AT THE FIRST FAILED PART INSTEAD OF DOWNLOADING THE REST OF THE LOG
+            for future in futures:
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+
+        pool = ThreadPoolExecutor(max_workers=Workers)
+
+        try:
+            for chunk in stream():
+                buffer += chunk
+                total += len(chunk)
+
+                while len(buffer) >= PartSize:
+                    if upload is None:
+                        upload = s3.create_multipart_upload(Bucket=BucketName, Key=DestFileLoc)["UploadId"]
+
+                    #WAIT FOR A FREE SLOT SO ONLY Workers PARTS ARE IN MEMORY
+                    slots.acquire()
+                    failed()
+                    futures.append(pool.submit(send, len(futures) + 1, bytes(buffer[:PartSize])))
+                    del buffer[:PartSize]
+
+            ####################################################################################################
+            ##  SMALL LOGS ARE A SINGLE PUT
+            ####################################################################################################
+
+            if upload is None:
+                s3.put_object(Bucket=BucketName, Key=DestFileLoc, Body=bytes(buffer))
+                return {"Bucket": BucketName, "Key": DestFileLoc, "Bytes": total, "Parts": 1}
+
+            if buffer:
+                slots.acquire()
+                futures.append(pool.submit(send, len(futures) + 1, bytes(buffer)))
+                buffer = bytearray()
+
+            parts = [future.result() for future in futures]
+            s3.complete_multipart_upload(Bucket=BucketName, Key=DestFileLoc, UploadId=upload, MultipartUpload={"Parts": parts})
+
+        except BaseException:
+            #NO PART MAY LAND AFTER THE ABORT, IT WOULD BE KEPT (AND BILLED) AS AN ORPHAN
+            pool.shutdown(wait=True, cancel_futures=True)
+            if upload is not None:
+                s3.abort_multipart_upload(Bucket=BucketName, Key=DestFileLoc, UploadId=upload)
+            raise
 
-    def TailLogs(self,Instance: str,LogFile: str):
+        finally:
+            pool.shutdown(wait=True)
+
+        return {"Bucket": BucketName, "Key": DestFileLoc, "Bytes": total, "Parts": len(parts)}
+
+    def TailLogs(self,Instance: str,LogFile: str,Follow: bool = False,Lines: int = 10,Interval: float = 1,MaxInterval: float = 30,Checkpoint: str = None,Severities = None,Records: bool = False):
         '''
         Tail a specific RDS log.
 
         Parameters:
             Instance: - The RDS instance name.
             LogFile: - The RDS log file name.  
+            Follow: - Keep following the log and yield new lines as they are written (default: False).
+            Lines: - Number of lines from the end of the log to start with when following (default: 10).
+            Interval: - Seconds to wait when no new data is found, doubled while idle (default: 1).
+            MaxInterval: - Longest wait between checks when idle (default: 30).
+            Checkpoint: - File to keep the last marker in, a restarted tail resumes from it (default: None).
+            Severities: - Only keep the records of these severities, see IterLogRecords (default: all).
+            Records: - Return LogRecord instead of lines (default: False).
 
         Returns
         RDS Log File Data
+            Follow = True returns a generator of log lines
+            Records = True returns a list of LogRecord, or a generator of LogRecord when following
         '''  
 
+        if Follow:
+            return self._FollowLog(Instance, LogFile, Lines, Interval, MaxInterval, Checkpoint, Severities, Records)
+
         data = self.rds.download_db_log_file_portion(
             DBInstanceIdentifier=Instance,
             LogFileName=LogFile
             )	
 
+        if Records:
+            return list(ParseRecords([data.get("LogFileData") or ""], Severities))
+
+        if Severities is not None:
+            parser = LogParser(Severities)
+            data["LogFileData"] = parser.FilterText(data.get("LogFileData") or "") + parser.FlushText()
+
         return data
 
-    def DownloadSlowQueries(self,Instance: str,LogFile: str,DLoc: str):
+    def _FollowLog(self,Instance: str,LogFile: str,Lines: int,Interval: float,MaxInterval: float,Checkpoint: str,Severities = None,Records: bool = False,Stop: threading.Event = None):
+        '''
+        Generator behind TailLogs(Follow=True).
+
+        The marker and the parser state are saved to the checkpoint after every portion has
+        been yielded, and the newest log file of the same directory is picked up when the
+        current one goes idle. Records are parsed as the portions come, the record still
+        open is given when the log goes idle. Setting Stop ends an idle tail.
+        '''
+
+        marker = None
+        parser = LogParser(Severities)
+        wait = Interval
+
+        def save():
+            if Checkpoint:
+                tmp = Checkpoint + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump({"Instance": Instance, "LogFile": LogFile, "Marker": marker, "Parser": parser.State()}, f)
+                os.replace(tmp, Checkpoint)
+
+        def flush():
+            #LAST RECORD OR LINE, NOTHING IS PENDING AFTER IT
+            return parser.Flush() if Records else parser.FlushText().split("\n")[:-1]
+
+        ####################################################################################################
+        ##  RESUME FROM THE CHECKPOINT
+        ####################################################################################################
+
+        if Checkpoint and os.path.isfile(Checkpoint):
+            with open(Checkpoint) as f:
+                saved = json.load(f)
+
+            if saved.get("Instance") == Instance:
+                LogFile = saved["LogFile"]
+                marker = saved["Marker"]
+                if saved.get("Parser"):
+                    parser.Restore(saved["Parser"])
+
+        while True:
+            ####################################################################################################
+            ##  READ EVERYTHING WRITTEN SINCE THE LAST MARKER
+            ####################################################################################################
+
+            if marker is None:
+                #NO MARKER = THE LAST LINES OF THE FILE
+                data = self.rds.download_db_log_file_portion(DBInstanceIdentifier=Instance, LogFileName=LogFile, NumberOfLines=Lines)
+                portions = [(data.get("LogFileData") or "", data.get("Marker"))]
+            else:
+                portions = self.IterLogPortions(Instance, LogFile, marker)
+
+            found = False
+
+            for data, marker in portions:
+                if data:
+                    found = True
+                    items = parser.Feed(data) if Records else parser.FilterText(data).split("\n")[:-1]
+
+                    for x, item in enumerate(items):
+                        try:
+                            yield item
+                        except GeneratorExit:
+                            #STOPPED AFTER THE LAST LINE OF THE PORTION
+                            if x == len(items) - 1:
+                                save()
+                            raise
+
+                save()
+
+            if found:
+                wait = Interval
+                continue
+
+            if Records:
+                #A RECORD IS COMPLETE WHEN THE NEXT ONE STARTS, DO NOT HOLD THE LAST ONE WHILE IDLE
+                pending = flush()
+                if pending:
+                    yield from pending
+                    save()
+
+            ####################################################################################################
+            ##  IDLE - CHECK FOR LOG ROTATION AND BACK OFF
+            ####################################################################################################
+
+            folder = LogFile.rsplit("/", 1)[0] + "/" if "/" in LogFile else ""
+            since = (time.time() - max(wait, 60) * 2) * 1e3
+            newest = None
+
+            for log in self.IterLogFiles(Instance, since):
+                if log['LogFileName'].startswith(folder) and (newest is None or log['LastWritten'] > newest['LastWritten']):
+                    newest = log
+
+            if newest is not None and newest['LogFileName'] != LogFile:
+                yield from flush()
+
+                LogFile = newest['LogFileName']
+                marker = "0"
+                parser = LogParser(Severities)
+                wait = Interval
+                save()
+                continue
+
+            if Stop is not None:
+                if Stop.wait(wait):
+                    return
+            else:
+                time.sleep(wait)
+            wait = min(wait * 2, MaxInterval)
+
+    def MonitorLogs(self,Instances: list,LogFile: str = None,Windows: tuple = WINDOWS,Resolution: int = 5,SlowMs: float = None,Interval: float = 5,MaxInterval: float = 30,Lines: int = 1000):
+        '''
+        Keep rolling window metrics of the PostgreSQL logs of many RDS instances.
+
+        Each instance log is followed on its own thread (see TailLogs) and its records are
+        counted per severity, statement and slow query in fixed size ring buffers, see
+        LogMetrics. Read them at any time with Snapshot, end with Stop.
+
+        Parameters:
+            Instances - RDS instance names.
+            LogFile - RDS log file to follow (default: the newest error/ log of each instance).
+            Windows - Window lengths in seconds (default: 60, 300, 900).
+            Resolution - Seconds per slot of the rings (default: 5).
+            SlowMs - Durations at or above it are slow queries (default: every logged duration).
+            Interval - Seconds between checks for new records (default: 5).
+            MaxInterval - Longest wait between checks when a log is idle (default: 30).
+            Lines - Number of lines from the end of the log to start with (default: 1000).
+
+        Returns
+            LogMonitor
+                Snapshot() -> {Instance: {Window seconds: {Severities, Statements, Errors, Slow,
+                    StatementRate, ErrorRate, SlowRate, Mean, P50, P95, P99}}}
+                errors -> {Instance: error that stopped its thread}
+        '''
+
+        monitor = LogMonitor(Windows, Resolution, SlowMs)
+
+        def follow(Instance):
+            log = LogFile
+
+            if log is None:
+                newest = None
+                for item in self.IterLogFiles(Instance):
+                    if item['LogFileName'].startswith("error/") and (newest is None or item['LastWritten'] > newest['LastWritten']):
+                        newest = item
+                if newest is None:
+                    raise ValueError(f"No error/ log file for {Instance}")
+                log = newest['LogFileName']
+
+            return self._FollowLog(Instance, log, Lines, Interval, MaxInterval, None, None, True, monitor.stopped)
+
+        for inst in Instances:
+            monitor.Start(inst, lambda inst=inst: follow(inst))
+
+        return monitor
+
+    def DownloadSlowQueries(self,Instance: str,LogFile: str,DLoc: str,RetOut: bool = False):
         '''
         Download slow queries.
 
@@ -161,91 +1499,60 @@ class AwsRds:
             Instance: - The RDS instance name.
             LogFile: - The RDS log file name.  
             DLoc: - The destination location and file name.
+            RetOut: - Standard Output True/False (default: False).
 
         Returns
-        RDS slow queries 
+        Number of slow queries written
         '''  
 
-        data = self.rds.download_db_log_file_portion(
-            DBInstanceIdentifier=Instance,
-            LogFileName=LogFile
-            )
-
-        val = ''
-        cnt = 1
-        slowquery = []
+        cnt = 0
 
         ####################################################################################################
-        ## GET THE LOG DATA INTO A TMP FILE
-        ## THE TEMP FILE WILL ALWAYS BE OVERWRITTEN
+        ## PARSE THE LOG PORTIONS AS THEY ARE DOWNLOADED
+        ## WRITE EACH SLOW QUERY AS SOON AS IT IS COMPLETE
         ####################################################################################################
 
-        parse=str(data['LogFileData'])
-        tmpfilename = "/var/scripts/db/aurora/slowqueries/files/tmplog"
-        tmpfile = open(tmpfilename,"w+")
-        tmpfile.write(parse)
-        tmpfile.close()
+        with open(DLoc, "w") as logfile:
+            for query in self.IterSlowQueries(Instance, LogFile):
+                logfile.write(query.Text + "\n")
+                cnt += 1
 
-        ####################################################################################################
-        ## GET THE SLOW QUERIES
-        ## LOOP TO GET THE VALUES NEEDED FROM THE TMP FILE
-        ####################################################################################################
+                if RetOut:
+                    print(query.Text)
 
-        with open(tmpfilename) as fp:
-            line = fp.readline()
-            cnt = 1
-            
-            while line:
-                dur = str.find(line,'duration:')
-                par = str.find(line,"parameters:")
-                x = 0
-
-                if(dur > 0 or par > 0):
-                    val = (line.strip())
-                    while x == 0:
-                        line = fp.readline()
-                        #NO NEW LINES
-                        if (line[20:24] == "UTC:"):
-                            x=1
-                        #YES NEW LINES
-                        elif (line[20:24] != "UTC:"):
-                            val = val + line
-                            x = 0
-                        #BLANK LINE EXIT LOOP
-                        if(line == ''):
-                            x = 1
-                else:
-                    line = fp.readline()
-                
-                if (val != ''):
-                    slowquery.append(val)
+        return cnt
 
-                cnt += 1
-                dur = ''
-                par = ''
-                val = ''
+    def IterSlowQueries(self,Instance: str,LogFile: str):
+        '''
+        Iterate over the slow queries of a RDS PostgreSQL log as it is downloaded.
+
+        Parameters:
+            Instance: - The RDS instance name.
+            LogFile: - The RDS log file name.  
+
+        Returns
+        Generator of SlowQuery(Time, Pid, User, Database, Duration, Statement, Parameters, Text)
+        '''  
 
-        #REMOVE TMPFILE
-        if os.path.exists(tmpfilename):
-            os.remove(tmpfilename)
+        return ParseSlowQueries(data for data, _ in self.IterLogPortions(Instance, LogFile))
 
-        ####################################################################################################
-        ## LOAD THE SLOW QUERY DATA INTO THE SLOW QUERY LOG
-        ####################################################################################################
+    def AggregateSlowQueries(self,Instance: str,LogFile: str,Stats: SlowQueryStats = None):
+        '''
+        Aggregate the slow queries of a RDS PostgreSQL log per fingerprint.
+
+        Parameters:
+            Instance: - The RDS instance name.
+            LogFile: - The RDS log file name.  
+            Stats: - SlowQueryStats to add to, to merge many files and instances (default: new).
 
-        sqcnt = len(slowquery)
+        Returns
+        SlowQueryStats
+        '''  
 
-        #IF THE FILE EXIST REMOVE IT TO REPLACE IT
-        fexist=os.path.isfile(DLoc)
-        if (fexist == True):
-            os.remove(DLoc)
+        if Stats is None:
+            Stats = SlowQueryStats()
 
-        #OPEN LOGFILE AND APPEND
-        with open(DLoc, "a") as logfile:
-            for x in range(sqcnt):
-                line = str.strip(slowquery[x])
-                print(line)
-                logfile.write(line + "\n")
+        return Stats.AddQueries(self.IterSlowQueries(Instance, LogFile))
 
     def Exists(self,Name: str,IsCluster: bool = True):
         '''
@@ -263,32 +1570,17 @@ class AwsRds:
         Returns
             True/False
         '''
-        #GET ALL CLUSTERS
-        cludata = self.rds.describe_db_clusters()
-        cnt=len(cludata['DBClusters'])
-        cluster_filldata = []
-
-        for x in range(cnt):
-            cluster_filldata.append(cludata['DBClusters'][x]['DBClusterIdentifier'])
-
-        #GET ALL INSTANCES
-        srvdata = self.rds.describe_db_instances()
-        cnt=len(srvdata['DBInstances'])
-        instance_filldata = []
-
-        for x in range(cnt):
-            instance_filldata.append(srvdata['DBInstances'][x]['DBInstanceIdentifier'])
-
-        if IsCluster:
-            if (Name in cluster_filldata):
-                retval=True
-            else:
-                retval=False
+        kind = "clusters" if IsCluster else "instances"
+        store = self._Stored(kind)
+
+        if store is not None:
+            retval = store.Exists(kind, Name)
+        elif IsCluster:
+            #GET ALL CLUSTERS
+            retval = Name in self._Inventory("clusters")
         else:
-            if (Name in instance_filldata):
-                retval=True
-            else:
-                retval=False
+            #GET ALL INSTANCES
+            retval = Name in self._Inventory("instances")
 
         return retval
 
@@ -308,54 +1600,23 @@ class AwsRds:
         Returns
             True/False
         '''
-        ###############################################################################################################
-        ##  RDS GET EVENTS
-        ##
-        ##  LOOKING FOR SERVER REBOOTS IN THE LAST 5 MINS (INPUT PARAMETER: IMIN)
-        ###############################################################################################################
-
-        if IsCluster:
-            if self.Exist(name=Name):
-                srvdata=self.rds.describe_db_clusters(
-                    DBClusterIdentifier=Name
-                )
-
-                cnt=len(srvdata['DBClusters'])
-
-                for x in range(cnt):
-                    if (srvdata['DBClusters'][x]['Status'] == 'available') or (srvdata['DBClusters'][x]['Status'] == 'backing-up'):
-                        if RtnText:
-                            retval = srvdata['DBClusters'][x]['Status']
-                        else:
-                            retval=True
-                    else:
-                        if RtnText:
-                            retval = srvdata['DBClusters'][x]['Status']
-                        else:
-                            retval=False
-            else:
-                retval=False
+        store = self._Stored("clusters" if IsCluster else "instances")
+
+        if store is not None:
+            status = store.Status("clusters" if IsCluster else "instances", Name)
+        elif IsCluster:
+            srvdata = self._Inventory("clusters").get(Name)
+            status = srvdata['Status'] if srvdata else None
         else:
-            if self.Exist(name=Name,iscluster=False):
-                srvdata=self.rds.describe_db_instances(
-                    DBInstanceIdentifier=Name
-                )
-
-                cnt=len(srvdata['DBInstances'])
-
-                for x in range(cnt):
-                    if (srvdata['DBInstances'][x]['DBInstanceStatus'] == 'available') or (srvdata['DBInstances'][x]['DBInstanceStatus'] == 'backing-up'):
-                        if RtnText:
-                            retval = srvdata['DBInstances'][x]['DBInstanceStatus']
-                        else:
-                            retval=True
-                    else:
-                        if RtnText:
-                            retval = srvdata['DBInstances'][x]['DBInstanceStatus']
-                        else:
-                            retval=False
-            else:
-                retval=False
+            srvdata = self._Inventory("instances").get(Name)
+            status = srvdata['DBInstanceStatus'] if srvdata else None
+
+        if status is None:
+            retval=False
+        elif RtnText:
+            retval = status
+        else:
+            retval = status in ('available', 'backing-up')
 
         return retval
 
@@ -407,28 +1668,28 @@ class AwsRds:
         Returns
             RDS Cluster Name
         '''	
-        ####################################################################################################
-        ##  GET ALL CLUSTERS
-        ####################################################################################################
+        return self.GetInstanceClusters([Instance])[Instance]
+
+    def GetInstanceClusters(self,Instances: list):
+        '''
+        Get the RDS cluster of many instances from a single cluster listing.
 
-        #CLUSTER
-        cludata = self.rds.describe_db_clusters()
-        cnt=len(cludata['DBClusters'])
-        cluster_filldata = []
+        Parameters:
+            Instances - list of RDS instance names.
 
-        for x in range(cnt):
-            cluster_filldata.append(cludata['DBClusters'][x]['DBClusterIdentifier'])
+        Returns
+            dict of instance name -> RDS Cluster (None if the instance is not in a cluster)
+        '''
 
-        ####################################################################################################
-        ##  CHECK FOR CURRENT CLUSTER
-        ####################################################################################################
+        store = self._Stored("clusters")
+        if store is not None:
+            return store.Clusters(Instances)
+
+        with self._cache_lock:
+            _, clusters, indexes = self._InventoryEntry("clusters")
+            members = indexes.get("members", {})
 
-        cnt=len(cludata['DBClusters'])
-        for x in range(cnt):
-            clu_mem=len(cludata['DBClusters'][x]['DBClusterMembers'])
-            for y in range(clu_mem):
-                if str(cludata['DBClusters'][x]['DBClusterMembers'][y]['DBInstanceIdentifier']) == Instance:
-                    return(cludata['DBClusters'][x])
+            return {ins: clusters.get(members.get(ins)) for ins in Instances}
 
     def AddEnvTag(self,Instance: str,Key: str,Value: str):
         '''
@@ -443,28 +1704,16 @@ class AwsRds:
             True/False
         '''	
 
-        #GET CLUSTER
-        CluData = self.GetInstanceCluster(Instance)
-
-        #GET INSTANCE
-        InsData = self.rds.describe_db_instances(DBInstanceIdentifier=Instance)
+        report = self.AddTags([Instance], {Key: Value})
+        errors = [row['Error'] for row in report if not row['Success']]
 
-        try:
-            if CluData != None:
-                clu_arn = CluData['DBClusterArn']
-                self.rds.add_tags_to_resource(ResourceName=clu_arn,Tags=[{'Key': Key, 'Value': Value}])
-
-            if InsData != None:
-                ins_arn = InsData['DBInstances'][0]['DBInstanceArn']
-                self.rds.add_tags_to_resource(ResourceName=ins_arn,Tags=[{'Key': Key, 'Value': Value}])
-
-            print(f"Tag Key={Key}, Value={Value} added to {Instance}")
-            return True
-
-        except BaseException as e:
-            print(f"ERROR: \n{e}")
+        if errors:
+            print(f"ERROR: \n{errors[0]}")
             return False
 
+        print(f"Tag Key={Key}, Value={Value} added to {Instance}")
+        return True
+
     def DelEnvTag(self,Instance: str,Key: str):
         '''
         Delete a Tag from a RDS Instance.
@@ -474,30 +1723,124 @@ class AwsRds:
             Key - Tag Key
 
         Returns
-            Nothing
+            True/False
         '''	
 
-        #GET CLUSTER
-        CluData = self.GetInstanceCluster(Instance)
+        report = self.RemoveTags([Instance], [Key])
+        errors = [row['Error'] for row in report if not row['Success']]
 
-        #GET INSTANCE
-        InsData = self.rds.describe_db_instances(DBInstanceIdentifier=Instance)
+        if errors:
+            print("ERROR: \n{0}".format(errors[0]))
+            return False
 
-        try:
-            if CluData != None:
-                clu_arn = CluData['DBClusterArn']
-                self.rds.remove_tags_from_resource(ResourceName=clu_arn,TagKeys=[Key])
+        print(f"Tag Key = {Key} was removed from {Instance}")
+        return True
 
-            if InsData != None:
-                ins_arn = InsData['DBInstances'][0]['DBInstanceArn']
-                self.rds.remove_tags_from_resource(ResourceName=ins_arn,TagKeys=[Key])
+    def AddTags(self,Instances: list,Tags: dict,TagCluster: bool = True,Workers: int = None):
+        '''
+        Add Tags to many RDS instances and their clusters.
 
-            print(f"Tag Key = {Key} was removed from {Instance}")
-            return True
+        Every tag is sent in a single call per resource, and a cluster shared by many of the
+        instances is tagged once.
 
-        except BaseException as e:
-            print("ERROR: \n{0}".format(e))
-            return False
+        Parameters:
+            Instances - list of RDS instance names.
+            Tags - dict of Tag Key -> Tag Value.
+            TagCluster - Also tag the cluster of each instance (default: True).
+            Workers - Maximum concurrent tagging calls (default: MaxWorkers).
+
+        Returns
+            list of {Resource, Type, Arn, Instances, Success, Error}, one per resource
+        '''
+
+        return self._TagResources(Instances, TagCluster, Workers, Add={str(key): str(val) for key, val in Tags.items()})
+
+    def RemoveTags(self,Instances: list,Keys: list,TagCluster: bool = True,Workers: int = None):
+        '''
+        Remove Tags from many RDS instances and their clusters.
+
+        Every tag key is sent in a single call per resource, and a cluster shared by many of
+        the instances is untagged once.
+
+        Parameters:
+            Instances - list of RDS instance names.
+            Keys - list of Tag Keys.
+            TagCluster - Also untag the cluster of each instance (default: True).
+            Workers - Maximum concurrent tagging calls (default: MaxWorkers).
+
+        Returns
+            list of {Resource, Type, Arn, Instances, Success, Error}, one per resource
+        '''
+
+        return self._TagResources(Instances, TagCluster, Workers, Remove=[str(key) for key in Keys])
+
+    def _TagResources(self,Instances: list,TagCluster: bool,Workers: int,Add: dict = None,Remove: list = None):
+        '''
+        Add or remove tags on many instances and their clusters concurrently.
+
+        The ARNs come from one inventory pass and the tagged entries are patched in the
+        cache, so tagging does not list the account again.
+
+        Parameters:
+            Instances - list of RDS instance names.
+            TagCluster - Also tag the cluster of each instance.
+            Workers - Maximum concurrent tagging calls (default: MaxWorkers).
+            Add - dict of Tag Key -> Tag Value to add.
+            Remove - list of Tag Keys to remove.
+
+        Returns
+            list of {Resource, Type, Arn, Instances, Success, Error}, one per resource
+        '''
+
+        Instances = list(dict.fromkeys(Instances))
+
+        with self._cache_lock:
+            inventory = self._Inventory("instances")
+            clusters = self.GetInstanceClusters(Instances) if TagCluster else {}
+
+        #ARN -> ROW, A CLUSTER SHARED BY MANY INSTANCES IS ONE ROW
+        targets = {}
+        report = []
+
+        for ins in Instances:
+            item = inventory.get(ins)
+            if item is None:
+                report.append({"Resource": ins, "Type": "instance", "Arn": None, "Instances": [ins], "Success": False, "Error": "DBInstanceNotFound"})
+                continue
+
+            targets[item['DBInstanceArn']] = {"Resource": ins, "Type": "instance", "Arn": item['DBInstanceArn'], "Instances": [ins], "Success": False, "Error": None, "Item": item}
+
+            clu = clusters.get(ins)
+            if clu is not None:
+                row = targets.setdefault(clu['DBClusterArn'], {"Resource": clu['DBClusterIdentifier'], "Type": "cluster", "Arn": clu['DBClusterArn'], "Instances": [], "Success": False, "Error": None, "Item": clu})
+                row['Instances'].append(ins)
+
+        def send(row):
+            try:
+                if Add:
+                    self.rds.add_tags_to_resource(ResourceName=row['Arn'], Tags=[{'Key': key, 'Value': val} for key, val in Add.items()])
+                if Remove:
+                    self.rds.remove_tags_from_resource(ResourceName=row['Arn'], TagKeys=Remove)
+                row['Success'] = True
+            except Exception as e:
+                row['Error'] = "{0}: {1}".format(type(e).__name__, e)
+
+            return row
+
+        if targets:
+            with ThreadPoolExecutor(max_workers=min(Workers or self.max_workers, len(targets))) as pool:
+                list(pool.map(send, targets.values()))
+
+        for row in targets.values():
+            item = row.pop('Item')
+            if row['Success']:
+                #PATCH THE CACHED TAGS INSTEAD OF LISTING AGAIN
+                tags = [tag for tag in item.get('TagList', []) if tag['Key'] not in (Add or {}) and tag['Key'] not in (Remove or [])]
+                tags.extend({'Key': key, 'Value': val} for key, val in (Add or {}).items())
+                self._StoreItem("instances" if row['Type'] == "instance" else "clusters", row['Resource'], dict(item, TagList=tags))
+            report.append(row)
+
+        return report
 
     def GetInstanceByTag(self,Key: str,Value: str):
         '''
@@ -511,28 +1854,25 @@ class AwsRds:
             InstanceName: [], DBName: []
         '''		
 
-        #GET INSTANCE
-        InsData = self.rds.describe_db_instances()
+        store = self._Stored("instances")
+        if store is not None:
+            return [{"InstanceName": InsName, "DBName": TagValue} for InsName, TagValue in store.Tagged("instances", Key, Value if Value != "" else None)]
 
-        #NUMBER OF INSTANCES
-        cnt=len(InsData['DBInstances'])
+        #GET INSTANCE TAG INDEX
+        with self._cache_lock:
+            _, InsData, indexes = self._InventoryEntry("instances")
+            TagData = indexes.get("tags", {}).get(Key, {})
 
-        #RETURN VALUE
-        RetData = []
+            #RETURN VALUE
+            RetData = []
 
-        for x in range(cnt):
-            InsArn = InsData['DBInstances'][x]['DBInstanceArn']
-            InsName = InsData['DBInstances'][x]['DBInstanceIdentifier']
-            TagData = self.rds.list_tags_for_resource(ResourceName=InsArn)
-            TagList = TagData['TagList']
-            
-            for tag in TagList:
-                if Value == "":
-                    if tag['Key'] == Key:
-                        RetData.append({"InstanceName": InsName, "DBName": tag['Value']})
-                else:
-                    if tag['Key'] == Key and tag['Value'] == Value:
-                        RetData.append({"InstanceName": InsName, "DBName": tag['Value']})
+            if Value == "":
+                for TagValue, InsNames in TagData.items():
+                    for InsName in InsNames:
+                        RetData.append({"InstanceName": InsName, "DBName": TagValue})
+            else:
+                for InsName in TagData.get(Value, []):
+                    RetData.append({"InstanceName": InsName, "DBName": Value})
 
         return RetData
 
@@ -562,14 +1902,12 @@ class AwsRds:
         ##  GET AUTOFILL SNAPSHOTS
         ####################################################################################################
 
-        srvdata = self.rds.describe_db_cluster_snapshots(DBClusterIdentifier = CluName)
-        cnt=len(srvdata['DBClusterSnapshots'])
         ss_data = []
         ss_retout = []
 
-        for x in range(cnt):
-            ss_name = srvdata['DBClusterSnapshots'][x]['DBClusterSnapshotIdentifier']
-            ss_date = srvdata['DBClusterSnapshots'][x]['SnapshotCreateTime']
+        for snap in self.IterClusterSnapshots(CluName):
+            ss_name = snap['DBClusterSnapshotIdentifier']
+            ss_date = snap['SnapshotCreateTime']
             ss_data.append({"Snapshot": ss_name, "Snapshot Date": str(ss_date)})
             ss_retout.append(ss_name)
         
@@ -600,27 +1938,23 @@ class AwsRds:
         ##  CHECK IF INSTANCE EXISTS
         ####################################################################################################
 
-        ins_run = self.Exist(Instance,0)
+        ins_run = self.Exists(Instance,False)
 
-        if ins_run ==0:
+        if ins_run == False:
             print('\n' + "ERROR: INSTANCE DOES NOT EXIST!!!" + '\n')
             sys.exit(1)
 
         ####################################################################################################
-        ##  CHECK TO SEE IF INSTANCE & CLUSTER IS RUNNING
+        ##  GET THE INSTANCE CLUSTER
         ####################################################################################################
 
         #GET CURRENT CLUSTER
         clu_data = self.GetInstanceCluster(Instance)
 
-        if clu_data != "None":
+        if clu_data != None:
             clu_name = clu_data['DBClusterIdentifier'] 
-            isclu = True
         else:
-            isclu = False
-
-        clu_run = self.Status(clu_name,True)
-        ins_run = self.Status(Instance,False)
+            clu_name = None
 
         ####################################################################################################
         ##  PROD PROTECTION
@@ -639,47 +1973,168 @@ class AwsRds:
         ##	PERFORM ACTION 
         ####################################################################################################
 
-        if str(Action).lower() == "stop":
-            if isclu and clu_run:
-                print(f"Stopping Cluster {clu_name}")
-                self.rds.stop_db_cluster(DBClusterIdentifier=clu_name)
+        self.InstancesAction([Instance], Action, Verbose=True)
+
+    def InstancesAction(self,Instances: list,Action: str,Timeout: int = 3600,Interval: float = 5,MaxInterval: float = 60,Callback = None,Verbose: bool = False):
+        '''
+        Perform an action on many RDS Instances at once.
+
+        Instances in a cluster act on their cluster, each cluster only once. The targets are
+        described fresh, not read from the cache, then all start/stop requests are sent
+        together and every target is polled with one describe call per kind each tick,
+        waiting Interval at first and longer while nothing changes. A target in the middle
+        of the opposite change (stopping when starting...) gets its request once it settles.
+
+        Parameters:
+            Instances - list of RDS Instance Names
+            Action - Action to perform
+                Options
+                    Start = Start the Instances
+                    Stop = Stop the Instances
+            Timeout - Seconds to wait for all targets (default: 3600)
+            Interval - Seconds between the first checks (default: 5)
+            MaxInterval - Longest wait between checks (default: 60)
+            Callback - Called with (Instance, Status) as soon as an instance reaches its state
+            Verbose - Print each request and state reached (default: False)
+
+        Returns
+            {Instance: {Status, Seconds, Error}}
+        '''
+
+        action = str(Action).lower()
+        if action not in ("start", "stop"):
+            raise ValueError(f"Unknown action {Action}")
+
+        state = "available" if action == "start" else "stopped"
+        start = time.monotonic()
+        results = {}
+
+        ####################################################################################################
+        ##  RESOLVE EACH INSTANCE TO ITS CLUSTER OR ITSELF
+        ####################################################################################################
+
+        targets = {}
+        instances = self._Inventory("instances")
+
+        for ins, clu in self.GetInstanceClusters(Instances).items():
+            if clu is not None:
+                targets.setdefault(("clusters", clu['DBClusterIdentifier']), []).append(ins)
+            elif ins in instances:
+                targets.setdefault(("instances", ins), []).append(ins)
+            else:
+                results[ins] = {"Status": None, "Seconds": 0.0, "Error": "Instance does not exist"}
+
+        def report(target, status, error=None):
+            for ins in targets.pop(target):
+                results[ins] = {"Status": status, "Seconds": round(time.monotonic() - start, 3), "Error": error}
+                if error is None:
+                    if Verbose:
+                        print(f"Instance {ins} is {status}")
+                    if Callback:
+                        Callback(ins, status)
 
-                run = ""
-                while run != "stopped":
-                    time.sleep(10)
-                    run = self.rds.Status(clu_name,1,1)
+        ####################################################################################################
+        ##  SEND EVERY REQUEST AT ONCE
+        ####################################################################################################
 
-            elif (isclu == 0) and (ins_run == 1):
-                print(f"Stopping Instance {Instance}")
-                self.rds.stop_db_instance(DBInstanceIdentifier=Instance)
+        def ready(status):
+            #ONLY STOP RUNNING / START STOPPED RESOURCES, OTHERWISE WAIT FOR THE CURRENT CHANGE
+            return (action == "stop" and status in ("available", "backing-up")) or (action == "start" and status == "stopped")
 
-                run = ""
-                while run != "stopped":
-                    time.sleep(10)
-                    run = self.rds.Status(Instance,0,1)
+        def request(target):
+            kind, name = target
+            if Verbose:
+                print(f"{'Stopping' if action == 'stop' else 'Starting'} {kind[:-1].capitalize()} {name}")
+            if kind == "clusters":
+                getattr(self.rds, f"{action}_db_cluster")(DBClusterIdentifier=name)
+            else:
+                getattr(self.rds, f"{action}_db_instance")(DBInstanceIdentifier=name)
 
-            print(f"Instance {Instance} is stopped")
+        def send(target, status):
+            if status == state:
+                return target, None, True, True
 
-        elif str(Action).lower() == "start":
-            if isclu and clu_run == False:
-                print("Starting Cluster " + clu_name)
-                self.rds.start_db_cluster(DBClusterIdentifier=clu_name)
+            if not ready(status):
+                return target, None, False, False
 
-                run = ""
-                while run != "available":
-                    time.sleep(10)
-                    run = self.Status(clu_name,1,1)	
+            try:
+                request(target)
+            except Exception as e:
+                return target, str(e), False, True
 
-            elif isclu == False and ins_run == False:
-                print(f"Starting Instance {Instance}")
-                self.rds.start_db_instance(DBInstanceIdentifier=Instance)	
+            return target, None, False, True
 
-                run = ""
-                while run != "available":
-                    time.sleep(10)
-                    run = self.Status(Instance,0,1)
-            
-            print(f"Instance {Instance} is available")	
+        #TARGETS WAITING FOR THE CURRENT CHANGE TO END BEFORE THEIR REQUEST IS SENT
+        pending = set()
+
+        #THE CACHE CAN BE CacheTTL/StoreTTL OLD, DECIDE FROM A FRESH DESCRIBE
+        statuses = {}
+        for kind in ("clusters", "instances"):
+            names = [name for k, name in targets if k == kind]
+            if not names:
+                continue
+
+            key = 'Status' if kind == "clusters" else 'DBInstanceStatus'
+
+            for name, item in self._PatchInventoryMany(kind, names).items():
+                if item is None:
+                    report((kind, name), None, "Does not exist")
+                else:
+                    statuses[(kind, name)] = item[key]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for target, err, done, sent in pool.map(send, list(statuses), list(statuses.values())):
+                if err is not None:
+                    report(target, None, err)
+                elif done:
+                    report(target, state)
+                elif not sent:
+                    pending.add(target)
+
+        ####################################################################################################
+        ##  POLL EVERY TARGET TOGETHER
+        ####################################################################################################
+
+        wait = Interval
+
+        while targets and (time.monotonic() - start) < Timeout:
+            time.sleep(min(wait, max(Timeout - (time.monotonic() - start), 0)))
+            changed = False
+
+            for kind in ("clusters", "instances"):
+                names = [name for k, name in targets if k == kind]
+                if not names:
+                    continue
+
+                key = 'Status' if kind == "clusters" else 'DBInstanceStatus'
+
+                for name, item in self._PatchInventoryMany(kind, names).items():
+                    target = (kind, name)
+                    if item is None:
+                        report(target, None, "Does not exist")
+                    elif item[key] == state:
+                        report(target, state)
+                        changed = True
+                    elif target in pending and ready(item[key]):
+                        #THE OPPOSITE CHANGE ENDED, SEND THE REQUEST NOW
+                        pending.discard(target)
+                        changed = True
+                        try:
+                            request(target)
+                        except Exception as e:
+                            report(target, None, str(e))
+
+            #CHECK SOON AFTER PROGRESS, SLOW DOWN WHILE WAITING
+            wait = Interval if changed else min(wait * 1.5, MaxInterval)
+
+        for target in list(targets):
+            report(target, None, "Timeout")
+
+        #THE CLUSTER MEMBERS CHANGE STATE WITH THE CLUSTER, SNAPSHOTS ARE UNTOUCHED
+        self.InvalidateCache("instances")
+        self.InvalidateCache("clusters")
+
+        return results
 
     def GetTopSnapshot(self, InstanceName: str = "ALL",SortOrder: str = "ASC"):
         '''
@@ -702,24 +2157,23 @@ class AwsRds:
         ####################################################################################################
 
         if str(InstanceName).lower() == "all":
-            westss = self.rds.describe_db_cluster_snapshots()
+            westss = self.IterClusterSnapshots()
         else:
             CluData = self.GetInstanceCluster(InstanceName)
             CluName = CluData['DBClusterIdentifier']
 
-            westss = self.rds.describe_db_cluster_snapshots(DBClusterIdentifier=CluName)
+            westss = self.IterClusterSnapshots(CluName)
         
         ####################################################################################################
         ##  GET THE INSTANCE DATA
         ####################################################################################################
 
-        cnt=len(westss['DBClusterSnapshots'])
         max_dt = ""
         max_ss = ""
 
-        for x in range(cnt):
-            ss_name = westss['DBClusterSnapshots'][x]['DBClusterSnapshotIdentifier']
-            ss_date = westss['DBClusterSnapshots'][x]['SnapshotCreateTime']
+        for snap in westss:
+            ss_name = snap['DBClusterSnapshotIdentifier']
+            ss_date = snap['SnapshotCreateTime']
             
             if max_dt == "":
                 max_dt = ss_date
@@ -750,22 +2204,24 @@ class AwsRds:
 
         ####################################################################################################
         ##  GET SNAPSHOT DATA
+        ##  A STORE ANSWERS FROM ITS LAST SNAPSHOT LISTING
         ####################################################################################################
 
-        snap = self.rds.describe_db_cluster_snapshots()
+        if self.store is not None:
+            return self._StoredSnapshots().SnapshotExists(SnapshotName)
+
+        snap = self.IterClusterSnapshots()
 
         ####################################################################################################
         ##  CHECK FOR SNAPSHOT
+        ##  STOP READING PAGES ON THE FIRST MATCH
         ####################################################################################################
 
-        cnt=len(snap['DBClusterSnapshots'])
-
         ss_exist = False
 
-        for x in range(cnt):
-            ss_name = snap['DBClusterSnapshots'][x]['DBClusterSnapshotIdentifier']
+        for ss in snap:
+            ss_name = ss['DBClusterSnapshotIdentifier']
             
-            #DESC ORDER
             if SnapshotName == ss_name:
                 ss_exist = True
                 break
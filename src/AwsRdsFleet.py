@@ -0,0 +1,124 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from AwsRds import AwsRds
+
+
+class AwsRdsFleet:
+    '''
+    Run the same AwsRds query against many (profile, region) targets concurrently.
+
+    Each target gets its own AwsRds, created on first use and kept for later queries.
+    Every target runs on its own worker, so the total time is about the slowest target
+    and a throttled or failing target only reports an error for itself.
+    '''
+
+    def __init__(self,Targets: list,CacheTTL: int = 60,Workers: int = None,Store: str = None):
+        self.targets = [tuple(target) for target in Targets]
+        self.cache_ttl = CacheTTL
+        self.workers = Workers or len(self.targets) or 1
+        self.store = Store
+        self._clients = {}
+        self._locks = {target: threading.Lock() for target in self.targets}
+
+    def Client(self,Profile: str,Region: str):
+        '''
+        Get the AwsRds of a target, creating it on first use.
+
+        Parameters:
+            Profile - AWS CLI Profile Name.
+            Region - AWS Region.
+
+        Returns
+            AwsRds
+        '''
+
+        target = (Profile, Region)
+
+        with self._locks.setdefault(target, threading.Lock()):
+            if target not in self._clients:
+                self._clients[target] = AwsRds(Profile, Region, self.cache_ttl, Store=self.store)
+
+            return self._clients[target]
+
+    def Run(self,Method: str,*args,Timeout: float = None,**kwargs):
+        '''
+        Run an AwsRds method on every target concurrently.
+
+        Parameters:
+            Method - AwsRds method name, e.g. GetInstance.
+            args, kwargs - Parameters of the method.
+            Timeout - Seconds to wait for all targets, targets still running are reported as an error (default: no limit).
+
+        Returns
+            Results: [{Profile, Region, Result, Seconds, Error}]
+            Merged: [{Profile, Region, Value}] - list results are flattened, one entry per item
+        '''
+
+        def call(target):
+            st = time.monotonic()
+            try:
+                result = getattr(self.Client(*target), Method)(*args, **kwargs)
+                err = None
+            except Exception as e:
+                result = None
+                err = "{0}: {1}".format(type(e).__name__, e)
+
+            return {"Profile": target[0], "Region": target[1], "Result": result, "Seconds": round(time.monotonic() - st, 3), "Error": err}
+
+        start = time.monotonic()
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="AwsRdsFleet")
+        futures = {pool.submit(call, target): target for target in self.targets}
+        wait(futures, timeout=Timeout)
+
+        #DO NOT WAIT FOR TARGETS PAST THE TIMEOUT
+        pool.shutdown(wait=False)
+
+        results = []
+        merged = []
+
+        for future, target in futures.items():
+            if future.done():
+                row = future.result()
+            else:
+                future.cancel()
+                row = {"Profile": target[0], "Region": target[1], "Result": None, "Seconds": round(time.monotonic() - start, 3), "Error": "Timeout"}
+
+            results.append(row)
+
+            if row["Error"] is None:
+                values = row["Result"] if isinstance(row["Result"], list) else [row["Result"]]
+                for value in values:
+                    merged.append({"Profile": row["Profile"], "Region": row["Region"], "Value": value})
+
+        return {"Results": results, "Merged": merged}
+
+    def GetInstance(self,Engine: str = "aurora-postgresql",Active: bool = False,Timeout: float = None):
+        '''
+        Get all RDS Instance by engine on every target.
+
+        Returns
+            Results: [{Profile, Region, Result, Seconds, Error}], Merged: [{Profile, Region, Value}]
+        '''
+
+        return self.Run("GetInstance", Engine, Active, Timeout=Timeout)
+
+    def GetTopSnapshot(self,InstanceName: str = "ALL",SortOrder: str = "ASC",Timeout: float = None):
+        '''
+        Get top RDS snapshot on every target.
+
+        Returns
+            Results: [{Profile, Region, Result, Seconds, Error}], Merged: [{Profile, Region, Value}]
+        '''
+
+        return self.Run("GetTopSnapshot", InstanceName, SortOrder, Timeout=Timeout)
+
+    def GetInstanceByTag(self,Key: str,Value: str,Timeout: float = None):
+        '''
+        Get RDS Instance by a Tag Value on every target.
+
+        Returns
+            Results: [{Profile, Region, Result, Seconds, Error}], Merged: [{Profile, Region, Value}]
+        '''
+
+        return self.Run("GetInstanceByTag", Key, Value, Timeout=Timeout)
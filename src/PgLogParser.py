@@ -0,0 +1,645 @@
+import re
+import math
+from collections import namedtuple
+
+
+####################################################################################################
+##  RDS POSTGRESQL LOG FORMAT
+##
+##  log_line_prefix = %t:%r:%u@%d:[%p]:
+##  2024-01-01 00:00:00 UTC:10.0.0.1(1234):app@db:[100]:LOG:  duration: 0.5 ms  statement: SELECT 1
+####################################################################################################
+
+PREFIX = re.compile(
+    r'^(?P<time>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:\.\d+)? [A-Z]+):(?P<host>.*?):(?P<user>[^:@]*)@(?P<db>[^:]*):\[(?P<pid>\d+)\]:(?P<severity>[A-Z0-9]+):\s*(?P<message>.*)$'
+)
+DURATION = re.compile(r'duration: (?P<duration>\d+(?:\.\d+)?) ms(?:\s+(?:statement|(?:execute|parse|bind) [^:]*):\s(?P<statement>.*))?', re.S)
+PARAMETERS = re.compile(r'parameters:\s(?P<parameters>.*)', re.S)
+
+SlowQuery = namedtuple("SlowQuery", ["Time", "Pid", "User", "Database", "Duration", "Statement", "Parameters", "Text"])
+
+#LEAST TO MOST SEVERE, AS client_min_messages ORDERS THEM
+LEVELS = ("DEBUG5", "DEBUG4", "DEBUG3", "DEBUG2", "DEBUG1", "LOG", "INFO", "NOTICE", "WARNING", "ERROR", "FATAL", "PANIC")
+
+#PREFIXED LINES THAT BELONG TO THE RECORD BEFORE THEM (SAME PID)
+ATTACHED = frozenset(("DETAIL", "HINT", "QUERY", "CONTEXT", "LOCATION", "STATEMENT"))
+
+
+class LogRecord(namedtuple("LogRecord", ["Time", "Host", "Pid", "User", "Database", "Severity", "Message", "Lines", "Head"])):
+    '''
+    One RDS PostgreSQL log record.
+
+    Message is the message of the first line, Lines the lines that follow it: continuation
+    lines and the DETAIL, HINT, STATEMENT... lines of the same pid. Head is the first line.
+    '''
+
+    __slots__ = ()
+
+    @property
+    def Text(self):
+        '''
+        The record as it is in the log.
+        '''
+
+        return "\n".join((self.Head,) + self.Lines)
+
+
+#BUILD A RECORD WITHOUT THE ARGUMENT CHECKS OF LogRecord(...)
+_NewRecord = tuple.__new__
+
+
+def SeverityFilter(Severities):
+    '''
+    Get the set of severities a filter keeps.
+
+    Parameters:
+        Severities - None for all, a severity name for it and every more severe one (e.g. ERROR = ERROR, FATAL, PANIC)
+            or a list of severity names.
+
+    Returns
+        frozenset of severity names, None for all
+    '''
+
+    if Severities is None:
+        return None
+
+    if isinstance(Severities, str):
+        level = Severities.upper()
+        if level not in LEVELS:
+            raise ValueError(f"Unknown severity {Severities}, expected one of {', '.join(LEVELS)}")
+        return frozenset(LEVELS[LEVELS.index(level):])
+
+    return frozenset(sev.upper() for sev in Severities)
+
+
+class LogParser:
+    '''
+    Incremental parser of RDS PostgreSQL log chunks.
+
+    Feed gives the LogRecord completed by each chunk, FilterText the text of the lines that
+    belong to the kept records, for writing them out as they come. An instance is used
+    for one of the two. With a filter, a chunk that cannot start a kept record (none of
+    the kept severities or none of the Contains strings appears in it) is skipped without
+    splitting it into lines.
+
+    Parameters:
+        Severities - Only keep these severities, see SeverityFilter (default: all).
+        Contains - Only keep the records whose first line message has one of these strings (default: all).
+    '''
+
+    __slots__ = ("wanted", "contains", "_tokens", "partial", "keep", "pid", "_head", "_lines")
+
+    def __init__(self,Severities = None,Contains: tuple = None):
+        self.wanted = SeverityFilter(Severities)
+        self.contains = tuple(Contains) if Contains else None
+        #SEVERITIES AS THEY ARE IN A PREFIXED LINE
+        self._tokens = tuple(f":{sev}:" for sev in self.wanted) if self.wanted is not None else None
+        #LINE CUT AT THE END OF THE LAST CHUNK
+        self.partial = ""
+        #IS THE CURRENT RECORD KEPT, ITS PID (WITHOUT A FILTER LINES BEFORE THE FIRST RECORD ARE KEPT TOO)
+        self.keep = self.wanted is None and self.contains is None
+        self.pid = None
+        self._head = None
+        self._lines = []
+
+    def _Lines(self,Chunk: str):
+        '''
+        Complete lines of a chunk, None when the chunk can be skipped.
+        '''
+
+        text = self.partial + Chunk
+        cut = text.rfind("\n")
+
+        if cut == -1:
+            self.partial = text
+            return []
+
+        self.partial = text[cut + 1:]
+        body = text[:cut]
+
+        #NOTHING IN THIS CHUNK CAN START A KEPT RECORD
+        if not self.keep and (
+                (self._tokens is not None and not any(token in body for token in self._tokens)) or
+                (self.contains is not None and not any(token in body for token in self.contains))):
+            self._Skip(body)
+            return None
+
+        return body.split("\n")
+
+    def _Skip(self,Body: str):
+        '''
+        Take the pid of the last record of a skipped chunk, for the attached lines of the next one.
+        '''
+
+        end = len(Body)
+
+        while end > 0:
+            start = Body.rfind("\n", 0, end) + 1
+            head = PREFIX.match(Body[start:end])
+            if head is not None:
+                self.pid = head.group('pid')
+                return
+            end = start - 1
+
+    def _Head(self,Head):
+        '''
+        Classify a prefixed line, returns True when it starts a new record.
+        '''
+
+        sev, pid, message = Head.group('severity', 'pid', 'message')
+
+        if sev in ATTACHED and pid == self.pid:
+            return False
+
+        self.pid = pid
+        self.keep = (self.wanted is None or sev in self.wanted) and (self.contains is None or any(token in message for token in self.contains))
+
+        return True
+
+    def _Record(self):
+        head = self._head
+        self._head = None
+        time, host, user, db, pid, sev, message = head.groups()
+
+        return _NewRecord(LogRecord, (time, host, int(pid), user, db, sev, message, tuple(self._lines), head.string))
+
+    def Feed(self,Chunk: str):
+        '''
+        Parse a chunk.
+
+        Returns
+            list of the LogRecord completed by the chunk
+        '''
+
+        out = []
+        lines = self._Lines(Chunk)
+
+        if lines is None:
+            #THE CURRENT RECORD IS NOT KEPT AND NO KEPT ONE STARTS HERE
+            return out
+
+        #THE PER LINE LOOP IS THE HOT PATH, STATE KEPT IN LOCALS
+        match = PREFIX.match
+        wanted = self.wanted
+        contains = self.contains
+        pid = self.pid
+        keep = self.keep
+        current = self._head
+        rest = self._lines
+
+        for line in lines:
+            head = match(line)
+
+            if head is not None:
+                sev = head.group('severity')
+
+                if sev not in ATTACHED or head.group('pid') != pid:
+                    if current is not None:
+                        self._head, self._lines = current, rest
+                        out.append(self._Record())
+
+                    pid = head.group('pid')
+                    keep = wanted is None or sev in wanted
+                    if keep and contains is not None:
+                        message = head.group('message')
+                        for token in contains:
+                            if token in message:
+                                break
+                        else:
+                            keep = False
+                    current = head if keep else None
+                    rest = []
+                    continue
+
+            #CONTINUATION OR ATTACHED LINE OF A KEPT RECORD
+            if current is not None:
+                rest.append(line)
+
+        self.pid, self.keep, self._head, self._lines = pid, keep, current, rest
+
+        return out
+
+    def Flush(self):
+        '''
+        End of the stream (or an idle tail), parse the cut line and complete the last record.
+
+        Returns
+            list of LogRecord
+        '''
+
+        out = self.Feed("\n") if self.partial else []
+
+        if self._head is not None:
+            out.append(self._Record())
+
+        return out
+
+    def FilterText(self,Chunk: str):
+        '''
+        Filter a chunk, keeping the lines of the kept records.
+
+        Returns
+            The kept lines, each ending with a new line
+        '''
+
+        lines = self._Lines(Chunk)
+
+        if not lines:
+            return ""
+
+        kept = []
+
+        for line in lines:
+            head = PREFIX.match(line)
+            if head is not None:
+                self._Head(head)
+            if self.keep:
+                kept.append(line)
+
+        return "\n".join(kept) + "\n" if kept else ""
+
+    def FlushText(self):
+        '''
+        End of the stream, filter the cut line.
+        '''
+
+        return self.FilterText("\n") if self.partial else ""
+
+    def State(self):
+        '''
+        State to save in a checkpoint, a record not completed yet is kept as text to parse again.
+        '''
+
+        if self._head is not None:
+            pending = "\n".join([self._head.string] + self._lines)
+            return {"Partial": pending + "\n" + self.partial, "Keep": False, "Pid": None}
+
+        return {"Partial": self.partial, "Keep": self.keep, "Pid": self.pid}
+
+    def Restore(self,State: dict):
+        '''
+        Continue from a checkpoint State.
+        '''
+
+        self.partial = State.get("Partial", "")
+        self.keep = State.get("Keep", False)
+        self.pid = State.get("Pid")
+
+
+def IterLines(Chunks):
+    '''
+    Split a stream of text chunks into lines, joining lines cut at a chunk boundary.
+
+    Parameters:
+        Chunks - iterable of str.
+
+    Returns
+        Generator of lines without the trailing new line
+    '''
+
+    partial = ""
+
+    for chunk in Chunks:
+        if not chunk:
+            continue
+
+        lines = (partial + chunk).split("\n")
+        partial = lines.pop()
+
+        yield from lines
+
+    if partial:
+        yield partial
+
+
+def ParseRecords(Chunks,Severities = None,Contains: tuple = None):
+    '''
+    Parse the records of a stream of RDS PostgreSQL log chunks in a single pass.
+
+    Parameters:
+        Chunks - iterable of str, e.g. the LogFileData of each log portion.
+        Severities - Only keep these severities, see SeverityFilter (default: all).
+        Contains - Only keep the records whose first line message has one of these strings (default: all).
+
+    Returns
+        Generator of LogRecord(Time, Host, Pid, User, Database, Severity, Message, Lines, Head)
+    '''
+
+    parser = LogParser(Severities, Contains)
+
+    for chunk in Chunks:
+        if chunk:
+            yield from parser.Feed(chunk)
+
+    yield from parser.Flush()
+
+
+def ParseSlowQueries(Chunks):
+    '''
+    Parse slow queries from a stream of RDS PostgreSQL log chunks in a single pass.
+
+    A slow query is a record whose first line has "duration:", it takes the continuation
+    lines that follow. A "DETAIL:  parameters:" line of the same pid is attached to it.
+
+    Parameters:
+        Chunks - iterable of str, e.g. the LogFileData of each log portion.
+
+    Returns
+        Generator of SlowQuery(Time, Pid, User, Database, Duration, Statement, Parameters, Text)
+            Duration is in milliseconds
+    '''
+
+    for rec in ParseRecords(Chunks, Contains=("duration:", "parameters:")):
+        #CONTINUATION LINES UP TO THE FIRST ATTACHED LINE
+        lines = []
+        detail = None
+        for line in rec.Lines:
+            head = PREFIX.match(line)
+            if head is None:
+                lines.append(line)
+                continue
+            if head.group('severity') == "DETAIL" and head.group('message').startswith("parameters:"):
+                detail = head
+            break
+
+        message = "\n".join([rec.Message] + lines)
+        dur = DURATION.search(message)
+        text = [rec.Head.strip()] + lines
+
+        yield SlowQuery(
+            rec.Time,
+            rec.Pid,
+            rec.User,
+            rec.Database,
+            float(dur.group('duration')) if dur else None,
+            (dur.group('statement') or "").strip() if dur else message.strip(),
+            PARAMETERS.match(detail.group('message')).group('parameters').strip() if detail else None,
+            "\n".join(text + [detail.string.strip()] if detail else text),
+        )
+
+
+####################################################################################################
+##  SLOW QUERY FINGERPRINTS
+####################################################################################################
+
+#ONE PASS SO A -- OR /* INSIDE A STRING IS NOT A COMMENT AND A QUOTE INSIDE A COMMENT IS NOT A STRING
+_TOKENS = re.compile(
+    r"(?P<comment>/\*.*?\*/|--[^\n]*)"
+    r"|(?P<string>[EeBbXxNn]?'(?:[^']|'')*')"
+    r"|(?P<param>\$\d+)"
+    r"|(?P<number>(?<![\w$.])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b)"
+    r'|(?P<identifier>"(?:[^"]|"")*")',
+    re.S,
+)
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS = re.compile(r'(\(\?\))(?:\s*,\s*\(\?\))+')
+_SPACES = re.compile(r'\s+')
+_QUOTED = re.compile(r'("(?:[^"]|"")*")')
+
+
+def _Token(Match):
+    #QUOTED IDENTIFIERS ARE KEPT, COMMENTS DROPPED, STRINGS, NUMBERS AND BIND PARAMETERS BECOME ?
+    kind = Match.lastgroup
+
+    if kind == "identifier":
+        return Match.group()
+    if kind == "comment":
+        return " "
+
+    return "?"
+
+
+def Fingerprint(Statement: str):
+    '''
+    Normalize a SQL statement so queries that only differ by their literals group together.
+
+    Comments are removed, strings, numbers and bind parameters become ?, IN lists and
+    VALUES rows collapse to a single (?), white space is collapsed and the text is lower cased,
+    except quoted identifiers which are case sensitive ("Orders" is not orders).
+
+    Parameters:
+        Statement - SQL statement.
+
+    Returns
+        Fingerprint
+    '''
+
+    val = _TOKENS.sub(_Token, Statement)
+    val = _LISTS.sub("(?)", val)
+    val = _ROWS.sub(r"\1", val)
+    val = _SPACES.sub(" ", val).strip().rstrip(";").strip()
+
+    if '"' not in val:
+        return val.lower()
+
+    #ODD PARTS ARE THE QUOTED IDENTIFIERS, ONLY THE TEXT AROUND THEM IS LOWER CASED
+    return "".join(part if x % 2 else part.lower() for x, part in enumerate(_QUOTED.split(val)))
+
+
+class DurationSketch:
+    '''
+    Mergeable streaming quantiles over durations, kept in log scaled buckets.
+
+    Each bucket covers a range of ACCURACY relative error and only buckets that were hit
+    are kept, so memory stays at a few dozen counters regardless of how many durations
+    are added.
+    '''
+
+    __slots__ = ("Count", "Total", "Max", "_buckets")
+
+    ACCURACY = 0.01
+    _GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+    _LOG_GAMMA = math.log(_GAMMA)
+    #0.001 ms TO ~1 DAY
+    _MIN = 1e-3
+    _SIZE = int(math.ceil(math.log(1e11) / _LOG_GAMMA)) + 2
+
+    def __init__(self):
+        self.Count = 0
+        self.Total = 0.0
+        self.Max = 0.0
+        self._buckets = {}
+
+    def Add(self,Value: float):
+        '''
+        Add a duration.
+        '''
+
+        self.Count += 1
+        self.Total += Value
+        if Value > self.Max:
+            self.Max = Value
+
+        if Value <= self._MIN:
+            idx = 0
+        else:
+            idx = min(int(math.ceil(math.log(Value / self._MIN) / self._LOG_GAMMA)), self._SIZE - 1)
+
+        self._buckets[idx] = self._buckets.get(idx, 0) + 1
+
+    def Merge(self,Other):
+        '''
+        Add the durations of another sketch.
+        '''
+
+        self.Count += Other.Count
+        self.Total += Other.Total
+        self.Max = max(self.Max, Other.Max)
+
+        for idx, cnt in Other._buckets.items():
+            self._buckets[idx] = self._buckets.get(idx, 0) + cnt
+
+    def Subtract(self,Other):
+        '''
+        Remove the durations of a sketch that was merged in, for rolling windows.
+
+        Max is kept, it stays an upper bound of the durations left.
+        '''
+
+        self.Count -= Other.Count
+        self.Total -= Other.Total
+
+        for idx, cnt in Other._buckets.items():
+            left = self._buckets.get(idx, 0) - cnt
+            if left > 0:
+                self._buckets[idx] = left
+            else:
+                self._buckets.pop(idx, None)
+
+        if self.Count <= 0:
+            self.Count, self.Total, self.Max = 0, 0.0, 0.0
+
+    def Quantile(self,Q: float):
+        '''
+        Get a quantile (0 - 1) of the durations, within ACCURACY relative error.
+        '''
+
+        if self.Count == 0:
+            return None
+
+        rank = Q * (self.Count - 1)
+        seen = 0
+
+        for idx, cnt in sorted(self._buckets.items()):
+            seen += cnt
+            if seen > rank:
+                if idx == 0:
+                    return self._MIN
+                #MIDDLE OF THE BUCKET, NEVER ABOVE THE MAX SEEN
+                return min(2 * self._MIN * self._GAMMA ** idx / (self._GAMMA + 1), self.Max)
+
+        return self.Max
+
+    @property
+    def Mean(self):
+        return self.Total / self.Count if self.Count else None
+
+    def __getstate__(self):
+        return (self.Count, self.Total, self.Max, self._buckets)
+
+    def __setstate__(self,State):
+        self.Count, self.Total, self.Max, self._buckets = State
+
+
+class SlowQueryStats:
+    '''
+    Aggregate slow queries per fingerprint.
+
+    Keeps a DurationSketch and one example statement per fingerprint, so a day of logs
+    from a whole fleet can be summarized in bounded memory. Stats from different files,
+    instances or processes (it pickles) are combined with Merge.
+    '''
+
+    __slots__ = ("_stats", "_examples", "ExampleLength")
+
+    def __init__(self,ExampleLength: int = 1000):
+        self._stats = {}
+        self._examples = {}
+        self.ExampleLength = ExampleLength
+
+    def __len__(self):
+        return len(self._stats)
+
+    def Add(self,Statement: str,Duration: float):
+        '''
+        Add a statement and its duration in milliseconds.
+        '''
+
+        fp = Fingerprint(Statement)
+        sketch = self._stats.get(fp)
+
+        if sketch is None:
+            sketch = self._stats[fp] = DurationSketch()
+            self._examples[fp] = Statement[:self.ExampleLength]
+
+        sketch.Add(Duration)
+
+    def AddQueries(self,Queries):
+        '''
+        Add SlowQuery records, records without a duration are skipped.
+
+        Returns
+            self
+        '''
+
+        for query in Queries:
+            if query.Duration is not None:
+                self.Add(query.Statement, query.Duration)
+
+        return self
+
+    def Merge(self,Other):
+        '''
+        Add the aggregates of another SlowQueryStats.
+
+        Returns
+            self
+        '''
+
+        for fp, sketch in Other._stats.items():
+            if fp in self._stats:
+                self._stats[fp].Merge(sketch)
+            else:
+                self._stats[fp] = DurationSketch()
+                self._stats[fp].Merge(sketch)
+                self._examples[fp] = Other._examples[fp]
+
+        return self
+
+    def Summary(self,Top: int = None,SortBy: str = "Total"):
+        '''
+        Summarize the aggregates.
+
+        Parameters:
+            Top - Only the first Top fingerprints (default: all).
+            SortBy - Count, Total, Mean, Max, P50, P95 or P99 (default: Total).
+
+        Returns
+            [{Fingerprint, Example, Count, Total, Mean, Max, P50, P95, P99}]
+                Durations are in milliseconds
+        '''
+
+        rows = []
+
+        for fp, sketch in self._stats.items():
+            rows.append({
+                "Fingerprint": fp,
+                "Example": self._examples[fp],
+                "Count": sketch.Count,
+                "Total": round(sketch.Total, 3),
+                "Mean": round(sketch.Mean, 3),
+                "Max": round(sketch.Max, 3),
+                "P50": round(sketch.Quantile(0.50), 3),
+                "P95": round(sketch.Quantile(0.95), 3),
+                "P99": round(sketch.Quantile(0.99), 3),
+            })
+
+        rows.sort(key=lambda row: row[SortBy], reverse=True)
+
+        return rows[:Top] if Top else rows
+
+    def __getstate__(self):
+        return (self._stats, self._examples, self.ExampleLength)
+
+    def __setstate__(self,State):
+        self._stats, self._examples, self.ExampleLength = State
@@ -0,0 +1,348 @@
+import json
+import time
+import bisect
+import functools
+import threading
+from collections import defaultdict
+from collections.abc import Iterator
+
+
+#ERROR CODES AWS USES FOR THROTTLING
+THROTTLE_CODES = frozenset((
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+    "SlowDown",
+))
+
+#LATENCY HISTOGRAM BUCKETS IN SECONDS
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    '''
+    Latency histogram with fixed buckets, as Prometheus expects them.
+    '''
+
+    __slots__ = ("Counts", "Count", "Sum")
+
+    def __init__(self):
+        self.Counts = [0] * (len(BUCKETS) + 1)
+        self.Count = 0
+        self.Sum = 0.0
+
+    def Add(self,Seconds: float):
+        self.Counts[bisect.bisect_left(BUCKETS, Seconds)] += 1
+        self.Count += 1
+        self.Sum += Seconds
+
+    def Snapshot(self):
+        cumulative = 0
+        buckets = {}
+
+        for bound, cnt in zip(BUCKETS + (float("inf"),), self.Counts):
+            cumulative += cnt
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+
+        return {"Count": self.Count, "Sum": round(self.Sum, 6), "Buckets": buckets}
+
+
+class Instrumentation:
+    '''
+    Opt-in counters for the RDS API calls made by an AwsRds.
+
+    Hooks the botocore event system of every client to record per operation call counts,
+    latency histograms, retries, throttling errors and log bytes downloaded, and wraps
+    the public AwsRds methods to record their latency and which API calls each of them
+    made. Nothing is hooked unless an AwsRds is created with Instrument=True.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.Reset()
+
+    def Reset(self):
+        '''
+        Clear every counter.
+        '''
+
+        with self._lock:
+            self._calls = defaultdict(int)
+            self._errors = defaultdict(int)
+            self._throttles = defaultdict(int)
+            self._retries = defaultdict(int)
+            self._latency = defaultdict(Histogram)
+            self._bytes = defaultdict(int)
+            self._methods = defaultdict(Histogram)
+            self._method_calls = defaultdict(lambda: defaultdict(int))
+            self._started = time.time()
+
+    ####################################################################################################
+    ##  BOTOCORE EVENTS
+    ####################################################################################################
+
+    def Register(self,Client):
+        '''
+        Hook the events of a boto3 client.
+
+        Parameters:
+            Client - boto3 client.
+
+        Returns
+            Nothing
+        '''
+
+        service = Client.meta.service_model.service_name
+        events = Client.meta.events
+
+        events.register(f"before-call.{service}", self._BeforeCall)
+        events.register(f"after-call.{service}", self._AfterCall)
+        events.register(f"after-call-error.{service}", self._AfterCallError)
+        events.register(f"needs-retry.{service}", self._NeedsRetry)
+
+    #BOTOCORE PASSES THE EVENT ARGUMENTS BY NAME AND NOT EVERY RELEASE SENDS ALL OF THEM,
+    #THE HOOKS ACCEPT ANY SUBSET SO INSTRUMENTING NEVER CHANGES THE EXCEPTION A CALLER SEES
+
+    @staticmethod
+    def _Operation(model,event_name):
+        #after-call-error.rds.DescribeDBInstances
+        if model is not None:
+            return model.name
+        return str(event_name).rsplit(".", 1)[-1]
+
+    @staticmethod
+    def _Seconds(context):
+        now = time.perf_counter()
+        return now - (context or {}).get("InstrumentationStart", now)
+
+    def _BeforeCall(self,model = None,context = None,**kwargs):
+        if context is not None:
+            context["InstrumentationStart"] = time.perf_counter()
+
+    def _AfterCall(self,http_response = None,parsed = None,model = None,context = None,event_name = None,**kwargs):
+        seconds = self._Seconds(context)
+        op = self._Operation(model, event_name)
+        meta = parsed.get("ResponseMetadata", {}) if isinstance(parsed, dict) else {}
+        code = parsed.get("Error", {}).get("Code") if isinstance(parsed, dict) else None
+        method = self._Method()
+
+        with self._lock:
+            self._calls[op] += 1
+            self._latency[op].Add(seconds)
+            self._retries[op] += meta.get("RetryAttempts", 0)
+
+            if code:
+                self._errors[op] += 1
+                if code in THROTTLE_CODES:
+                    self._throttles[op] += 1
+
+            if op == "DownloadDBLogFilePortion":
+                self._bytes[op] += len((parsed.get("LogFileData") or "").encode("utf-8"))
+
+            if method is not None:
+                self._method_calls[method][op] += 1
+
+    def _AfterCallError(self,model = None,context = None,exception = None,event_name = None,**kwargs):
+        seconds = self._Seconds(context)
+        op = self._Operation(model, event_name)
+        method = self._Method()
+
+        with self._lock:
+            self._calls[op] += 1
+            self._latency[op].Add(seconds)
+            self._errors[op] += 1
+
+            if method is not None:
+                self._method_calls[method][op] += 1
+
+    def _NeedsRetry(self,response = None,operation = None,attempts = 0,**kwargs):
+        #EVERY ATTEMPT, INCLUDING THROTTLES THE RETRY HANDLER HIDES
+        if response is not None and operation is not None and attempts > 0:
+            code = response[1].get("Error", {}).get("Code") if isinstance(response[1], dict) else None
+            if code in THROTTLE_CODES and response[0] is not None and response[0].status_code >= 300:
+                with self._lock:
+                    self._throttles[operation.name + ":Attempt"] += 1
+
+    ####################################################################################################
+    ##  PUBLIC METHODS
+    ####################################################################################################
+
+    def _Method(self):
+        stack = getattr(self._local, "stack", None)
+        return stack[0] if stack else None
+
+    def _Stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _Consume(self,Name: str,Result,Seconds: float):
+        '''
+        Run a lazy result under its method: every step counts in its latency and its API calls.
+        '''
+
+        try:
+            while True:
+                stack = self._Stack()
+                stack.append(Name)
+                st = time.perf_counter()
+
+                try:
+                    item = next(Result)
+                except StopIteration:
+                    return
+                finally:
+                    stack.pop()
+                    Seconds += time.perf_counter() - st
+
+                yield item
+        finally:
+            #STOPPED EARLY, LET THE ITERATOR CLEAN UP (E.G. TailLogs SAVES ITS CHECKPOINT)
+            if hasattr(Result, "close"):
+                Result.close()
+            with self._lock:
+                self._methods[Name].Add(Seconds)
+
+    def Wrap(self,Name: str,Method):
+        '''
+        Wrap a bound AwsRds method to record its latency and attribute API calls to it.
+
+        API calls are attributed to the outermost instrumented method of the thread.
+        Methods returning a lazy iterator (generators, map...) make their calls while it is
+        consumed: the iterator is wrapped so each step runs under the method, and the
+        latency recorded is the time spent in the call and in every step, once it is
+        exhausted or closed.
+
+        Parameters:
+            Name - Method name.
+            Method - Bound method.
+
+        Returns
+            Wrapped method
+        '''
+
+        @functools.wraps(Method)
+        def wrapper(*args,**kwargs):
+            stack = self._Stack()
+            stack.append(Name)
+            st = time.perf_counter()
+            result = None
+
+            try:
+                result = Method(*args, **kwargs)
+            finally:
+                stack.pop()
+                if not isinstance(result, Iterator):
+                    with self._lock:
+                        self._methods[Name].Add(time.perf_counter() - st)
+
+            if isinstance(result, Iterator):
+                return self._Consume(Name, result, time.perf_counter() - st)
+
+            return result
+
+        return wrapper
+
+    ####################################################################################################
+    ##  EXPORT
+    ####################################################################################################
+
+    def Snapshot(self):
+        '''
+        Get every counter.
+
+        Returns
+            {Since, Operations: {Operation: {Calls, Errors, Throttles, Retries, Latency}}, Methods: {Method: {Latency, ApiCalls}}, BytesDownloaded, ThrottledAttempts}
+        '''
+
+        with self._lock:
+            ops = {}
+            for op in set(self._calls) | set(self._throttles):
+                if op.endswith(":Attempt"):
+                    continue
+                ops[op] = {
+                    "Calls": self._calls.get(op, 0),
+                    "Errors": self._errors.get(op, 0),
+                    "Throttles": self._throttles.get(op, 0),
+                    "Retries": self._retries.get(op, 0),
+                    "Latency": self._latency[op].Snapshot() if op in self._latency else Histogram().Snapshot(),
+                }
+
+            methods = {}
+            for name, hist in self._methods.items():
+                methods[name] = {"Latency": hist.Snapshot(), "ApiCalls": dict(self._method_calls.get(name, {}))}
+
+            attempts = {op.split(":")[0]: cnt for op, cnt in self._throttles.items() if op.endswith(":Attempt")}
+
+            return {
+                "Since": self._started,
+                "Operations": ops,
+                "Methods": methods,
+                "BytesDownloaded": sum(self._bytes.values()),
+                "ThrottledAttempts": attempts,
+            }
+
+    def ToJson(self):
+        '''
+        Get every counter as JSON.
+        '''
+
+        return json.dumps(self.Snapshot(), indent=2, sort_keys=True)
+
+    def ToPrometheus(self,Prefix: str = "awsrds"):
+        '''
+        Get every counter in the Prometheus text exposition format.
+        '''
+
+        snap = self.Snapshot()
+        out = []
+
+        def histogram(name, label, hist):
+            for bound, cnt in hist["Buckets"].items():
+                out.append(f'{Prefix}_{name}_seconds_bucket{{{label},le="{bound}"}} {cnt}')
+            out.append(f'{Prefix}_{name}_seconds_sum{{{label}}} {hist["Sum"]}')
+            out.append(f'{Prefix}_{name}_seconds_count{{{label}}} {hist["Count"]}')
+
+        for metric, key, help in (
+            ("api_calls_total", "Calls", "RDS API calls"),
+            ("api_errors_total", "Errors", "RDS API calls that returned an error"),
+            ("api_throttles_total", "Throttles", "RDS API calls that failed with a throttling error"),
+            ("api_retries_total", "Retries", "RDS API call retries"),
+        ):
+            out.append(f"# HELP {Prefix}_{metric} {help}")
+            out.append(f"# TYPE {Prefix}_{metric} counter")
+            for op, row in sorted(snap["Operations"].items()):
+                out.append(f'{Prefix}_{metric}{{operation="{op}"}} {row[key]}')
+
+        out.append(f"# HELP {Prefix}_api_throttled_attempts_total Throttled attempts, including the ones retried successfully")
+        out.append(f"# TYPE {Prefix}_api_throttled_attempts_total counter")
+        for op, cnt in sorted(snap["ThrottledAttempts"].items()):
+            out.append(f'{Prefix}_api_throttled_attempts_total{{operation="{op}"}} {cnt}')
+
+        out.append(f"# HELP {Prefix}_api_latency_seconds RDS API call latency")
+        out.append(f"# TYPE {Prefix}_api_latency_seconds histogram")
+        for op, row in sorted(snap["Operations"].items()):
+            histogram("api_latency", f'operation="{op}"', row["Latency"])
+
+        out.append(f"# HELP {Prefix}_method_latency_seconds AwsRds method latency")
+        out.append(f"# TYPE {Prefix}_method_latency_seconds histogram")
+        for name, row in sorted(snap["Methods"].items()):
+            histogram("method_latency", f'method="{name}"', row["Latency"])
+
+        out.append(f"# HELP {Prefix}_method_api_calls_total RDS API calls made by each AwsRds method")
+        out.append(f"# TYPE {Prefix}_method_api_calls_total counter")
+        for name, row in sorted(snap["Methods"].items()):
+            for op, cnt in sorted(row["ApiCalls"].items()):
+                out.append(f'{Prefix}_method_api_calls_total{{method="{name}",operation="{op}"}} {cnt}')
+
+        out.append(f"# HELP {Prefix}_log_bytes_downloaded_total Log bytes downloaded")
+        out.append(f"# TYPE {Prefix}_log_bytes_downloaded_total counter")
+        out.append(f"{Prefix}_log_bytes_downloaded_total {snap['BytesDownloaded']}")
+
+        return "\n".join(out) + "\n"
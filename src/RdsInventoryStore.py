@@ -0,0 +1,405 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    refreshed REAL NOT NULL,
+    PRIMARY KEY (scope, kind)
+);
+CREATE TABLE IF NOT EXISTS resources (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    engine TEXT,
+    status TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (scope, kind, identifier)
+);
+CREATE INDEX IF NOT EXISTS resources_engine ON resources (scope, kind, engine, status);
+CREATE TABLE IF NOT EXISTS members (
+    scope TEXT NOT NULL,
+    instance TEXT NOT NULL,
+    cluster TEXT NOT NULL,
+    PRIMARY KEY (scope, instance)
+);
+CREATE INDEX IF NOT EXISTS members_cluster ON members (scope, cluster);
+CREATE TABLE IF NOT EXISTS tags (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tags_value ON tags (scope, kind, key, value);
+CREATE INDEX IF NOT EXISTS tags_identifier ON tags (scope, kind, identifier);
+CREATE TABLE IF NOT EXISTS snapshots (
+    scope TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    cluster TEXT,
+    created TEXT,
+    status TEXT,
+    type TEXT,
+    PRIMARY KEY (scope, identifier)
+);
+CREATE INDEX IF NOT EXISTS snapshots_cluster ON snapshots (scope, cluster, created);
+'''
+
+#KIND -> (IDENTIFIER KEY, STATUS KEY)
+KEYS = {
+    "instances": ("DBInstanceIdentifier", "DBInstanceStatus"),
+    "clusters": ("DBClusterIdentifier", "Status"),
+}
+
+
+def _Encode(Value):
+    #DESCRIBE ENTRIES CARRY DATETIMES, KEEP THEM AS DATETIMES ACROSS A ROUND TRIP
+    if isinstance(Value, datetime):
+        return {"__datetime__": Value.isoformat()}
+
+    raise TypeError(f"{type(Value).__name__} is not JSON serializable")
+
+
+def _Decode(Value):
+    if "__datetime__" in Value:
+        return datetime.fromisoformat(Value["__datetime__"])
+
+    return Value
+
+
+def _SnapshotRow(Snapshot):
+    created = Snapshot.CreateTime.isoformat() if isinstance(Snapshot.CreateTime, datetime) else Snapshot.CreateTime
+
+    return (Snapshot.Cluster, created, Snapshot.Status, Snapshot.Type)
+
+
+class InventoryStore:
+    '''
+    SQLite inventory of instances, clusters, cluster membership, tags and snapshots.
+
+    Lets a short lived script answer Exists, GetInstance, GetInstanceByTag... from the last
+    listing of an earlier run instead of describing the whole account again. Rows are kept
+    per Scope (profile/region) so one file can hold many accounts, and every kind records
+    when it was last listed so callers can apply their own freshness bound.
+    '''
+
+    def __init__(self,Path: str,Scope: str):
+        Path = os.path.expanduser(Path)
+        if os.path.dirname(Path):
+            os.makedirs(os.path.dirname(Path), exist_ok=True)
+
+        self.path = Path
+        self.scope = Scope
+        self._lock = threading.RLock()
+        #SHARED BY THE THREADS OF AN AwsRds, CALLS ARE SERIALIZED BY THE LOCK
+        self._db = sqlite3.connect(Path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def Close(self):
+        '''
+        Close the database.
+        '''
+
+        with self._lock:
+            self._db.close()
+
+    ####################################################################################################
+    ##  FRESHNESS
+    ####################################################################################################
+
+    def Age(self,Kind: str):
+        '''
+        Seconds since a kind was last listed, None if it never was or was invalidated.
+        '''
+
+        with self._lock:
+            row = self._db.execute("SELECT refreshed FROM meta WHERE scope = ? AND kind = ?", (self.scope, Kind)).fetchone()
+
+        return time.time() - row[0] if row and row[0] else None
+
+    def Fresh(self,Kind: str,MaxAge: float):
+        '''
+        Check if a kind was listed less than MaxAge seconds ago.
+        '''
+
+        age = self.Age(Kind)
+
+        return age is not None and age < MaxAge
+
+    def Invalidate(self,Kind: str = "ALL"):
+        '''
+        Mark a kind as stale so the next read lists it again, the rows are kept.
+
+        Parameters:
+            Kind - instances, clusters, snapshots or ALL (default: ALL).
+        '''
+
+        with self._lock:
+            if str(Kind).lower() == "all":
+                self._db.execute("UPDATE meta SET refreshed = 0 WHERE scope = ?", (self.scope,))
+            else:
+                self._db.execute("UPDATE meta SET refreshed = 0 WHERE scope = ? AND kind = ?", (self.scope, Kind))
+
+    ####################################################################################################
+    ##  WRITES
+    ####################################################################################################
+
+    def _Delete(self,Kind: str,Name: str):
+        self._db.execute("DELETE FROM resources WHERE scope = ? AND kind = ? AND identifier = ?", (self.scope, Kind, Name))
+        self._db.execute("DELETE FROM tags WHERE scope = ? AND kind = ? AND identifier = ?", (self.scope, Kind, Name))
+        if Kind == "clusters":
+            self._db.execute("DELETE FROM members WHERE scope = ? AND cluster = ?", (self.scope, Name))
+
+    def _Insert(self,Kind: str,Name: str,Item: dict,Data: str):
+        self._db.execute(
+            "INSERT INTO resources (scope, kind, identifier, engine, status, data) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.scope, Kind, Name, Item.get('Engine'), Item.get(KEYS[Kind][1]), Data),
+        )
+        self._db.executemany(
+            "INSERT INTO tags (scope, kind, identifier, key, value) VALUES (?, ?, ?, ?, ?)",
+            [(self.scope, Kind, Name, tag['Key'], tag['Value']) for tag in Item.get('TagList', [])],
+        )
+        if Kind == "clusters":
+            self._db.executemany(
+                "INSERT OR REPLACE INTO members (scope, instance, cluster) VALUES (?, ?, ?)",
+                [(self.scope, mem['DBInstanceIdentifier'], Name) for mem in Item.get('DBClusterMembers', [])],
+            )
+
+    def Replace(self,Kind: str,Items: dict):
+        '''
+        Store a full listing of instances or clusters.
+
+        Only the entries that changed since the last listing are rewritten and the ones
+        that are gone are deleted, so a refresh of an unchanged fleet writes nothing but
+        the refresh time.
+
+        Parameters:
+            Kind - instances or clusters.
+            Items - dict of identifier -> describe entry.
+
+        Returns
+            Number of entries written or deleted
+        '''
+
+        data = {name: json.dumps(item, default=_Encode, sort_keys=True) for name, item in Items.items()}
+        changed = 0
+
+        with self._lock:
+            old = dict(self._db.execute("SELECT identifier, data FROM resources WHERE scope = ? AND kind = ?", (self.scope, Kind)))
+
+            self._db.execute("BEGIN")
+            try:
+                for name in old.keys() - data.keys():
+                    self._Delete(Kind, name)
+                    changed += 1
+
+                for name, text in data.items():
+                    if old.get(name) != text:
+                        self._Delete(Kind, name)
+                        self._Insert(Kind, name, Items[name], text)
+                        changed += 1
+
+                self._Touch(Kind)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+        return changed
+
+    def Put(self,Kind: str,Name: str,Item: dict):
+        '''
+        Store a single instance or cluster without changing the refresh time.
+
+        Parameters:
+            Kind - instances or clusters.
+            Name - RDS instance or cluster name.
+            Item - describe entry, None to delete it.
+        '''
+
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._Delete(Kind, Name)
+                if Item is not None:
+                    self._Insert(Kind, Name, Item, json.dumps(Item, default=_Encode, sort_keys=True))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def ReplaceSnapshots(self,Snapshots):
+        '''
+        Store a full listing of cluster snapshots.
+
+        Parameters:
+            Snapshots - iterable of SnapshotInfo.
+
+        Returns
+            Number of snapshots written or deleted
+        '''
+
+        rows = {snap.Identifier: _SnapshotRow(snap) for snap in Snapshots}
+
+        with self._lock:
+            old = {row[0]: row[1:] for row in self._db.execute("SELECT identifier, cluster, created, status, type FROM snapshots WHERE scope = ?", (self.scope,))}
+
+            self._db.execute("BEGIN")
+            try:
+                gone = [(self.scope, name) for name in old.keys() - rows.keys()]
+                self._db.executemany("DELETE FROM snapshots WHERE scope = ? AND identifier = ?", gone)
+
+                new = [(self.scope, name) + row for name, row in rows.items() if old.get(name) != row]
+                self._db.executemany("INSERT OR REPLACE INTO snapshots (scope, identifier, cluster, created, status, type) VALUES (?, ?, ?, ?, ?, ?)", new)
+
+                self._Touch("snapshots")
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+        return len(gone) + len(new)
+
+    def PutSnapshot(self,Name: str,Snapshot):
+        '''
+        Store a single cluster snapshot without changing the refresh time.
+
+        Parameters:
+            Name - RDS cluster snapshot name.
+            Snapshot - SnapshotInfo, None to delete it.
+        '''
+
+        with self._lock:
+            if Snapshot is None:
+                self._db.execute("DELETE FROM snapshots WHERE scope = ? AND identifier = ?", (self.scope, Name))
+            else:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO snapshots (scope, identifier, cluster, created, status, type) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.scope, Name) + _SnapshotRow(Snapshot),
+                )
+
+    def _Touch(self,Kind: str):
+        self._db.execute("INSERT OR REPLACE INTO meta (scope, kind, refreshed) VALUES (?, ?, ?)", (self.scope, Kind, time.time()))
+
+    ####################################################################################################
+    ##  READS
+    ####################################################################################################
+
+    def Load(self,Kind: str):
+        '''
+        Get every stored instance or cluster.
+
+        Returns
+            dict of identifier -> describe entry
+        '''
+
+        with self._lock:
+            rows = self._db.execute("SELECT identifier, data FROM resources WHERE scope = ? AND kind = ?", (self.scope, Kind)).fetchall()
+
+        return {name: json.loads(data, object_hook=_Decode) for name, data in rows}
+
+    def Get(self,Kind: str,Name: str):
+        '''
+        Get a stored instance or cluster.
+
+        Returns
+            describe entry, None if it is not stored
+        '''
+
+        with self._lock:
+            row = self._db.execute("SELECT data FROM resources WHERE scope = ? AND kind = ? AND identifier = ?", (self.scope, Kind, Name)).fetchone()
+
+        return json.loads(row[0], object_hook=_Decode) if row else None
+
+    def Exists(self,Kind: str,Name: str):
+        '''
+        Check if an instance or cluster is stored.
+        '''
+
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM resources WHERE scope = ? AND kind = ? AND identifier = ?", (self.scope, Kind, Name)).fetchone() is not None
+
+    def Status(self,Kind: str,Name: str):
+        '''
+        Get the stored status of an instance or cluster, None if it is not stored.
+        '''
+
+        with self._lock:
+            row = self._db.execute("SELECT status FROM resources WHERE scope = ? AND kind = ? AND identifier = ?", (self.scope, Kind, Name)).fetchone()
+
+        return row[0] if row else None
+
+    def Instances(self,Engine: str,Status: str = None):
+        '''
+        Get the stored instance names of an engine, optionally only the ones in a status.
+        '''
+
+        sql = "SELECT identifier FROM resources WHERE scope = ? AND kind = 'instances' AND engine = ?"
+        args = [self.scope, Engine]
+
+        if Status is not None:
+            sql += " AND status = ?"
+            args.append(Status)
+
+        with self._lock:
+            return [row[0] for row in self._db.execute(sql + " ORDER BY rowid", args)]
+
+    def Tagged(self,Kind: str,Key: str,Value: str = None):
+        '''
+        Get the stored instances or clusters with a tag.
+
+        Parameters:
+            Kind - instances or clusters.
+            Key - Tag Key.
+            Value - Tag Value, None for any value.
+
+        Returns
+            list of (identifier, tag value)
+        '''
+
+        sql = "SELECT identifier, value FROM tags WHERE scope = ? AND kind = ? AND key = ?"
+        args = [self.scope, Kind, Key]
+
+        if Value is not None:
+            sql += " AND value = ?"
+            args.append(Value)
+
+        with self._lock:
+            return [tuple(row) for row in self._db.execute(sql + " ORDER BY rowid", args)]
+
+    def Clusters(self,Instances: list):
+        '''
+        Get the stored cluster of many instances.
+
+        Returns
+            dict of instance name -> cluster describe entry (None if the instance is not in a cluster)
+        '''
+
+        found = dict.fromkeys(Instances)
+        cache = {}
+
+        with self._lock:
+            for ins in found:
+                row = self._db.execute("SELECT cluster FROM members WHERE scope = ? AND instance = ?", (self.scope, ins)).fetchone()
+                if row is not None:
+                    if row[0] not in cache:
+                        cache[row[0]] = self.Get("clusters", row[0])
+                    found[ins] = cache[row[0]]
+
+        return found
+
+    def SnapshotExists(self,Name: str):
+        '''
+        Check if a cluster snapshot is stored.
+        '''
+
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM snapshots WHERE scope = ? AND identifier = ?", (self.scope, Name)).fetchone() is not None
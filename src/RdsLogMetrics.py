@@ -0,0 +1,296 @@
+import time
+import calendar
+import threading
+from PgLogParser import LEVELS, DURATION, DurationSketch
+
+
+#ROLLING WINDOWS IN SECONDS: 1, 5 AND 15 MINUTES
+WINDOWS = (60, 300, 900)
+
+#COUNTERS OF A BUCKET: ONE PER SEVERITY, THEN STATEMENTS AND SLOW QUERIES
+_SEVERITY = {sev: x for x, sev in enumerate(LEVELS)}
+_STATEMENTS = len(LEVELS)
+_SLOW = len(LEVELS) + 1
+_ERRORS = tuple(_SEVERITY[sev] for sev in ("ERROR", "FATAL", "PANIC"))
+
+#MESSAGES OF A STATEMENT LOGGED BY log_statement
+_STATEMENT_MESSAGES = ("statement:", "execute ")
+
+
+class _Bucket:
+    '''
+    Counters and durations of a slot of the ring or of a whole window.
+    '''
+
+    __slots__ = ("Index", "Counts", "Durations")
+
+    def __init__(self,Index: int = None):
+        self.Index = Index
+        self.Counts = [0] * (len(LEVELS) + 2)
+        self.Durations = DurationSketch()
+
+    def Subtract(self,Other):
+        self.Counts = [x - y for x, y in zip(self.Counts, Other.Counts)]
+        self.Durations.Subtract(Other.Durations)
+
+
+class _Window:
+    '''
+    A rolling window: the running total of its last Span slots.
+    '''
+
+    __slots__ = ("Seconds", "Span", "Total")
+
+    def __init__(self,Seconds: int,Span: int):
+        self.Seconds = Seconds
+        self.Span = Span
+        self.Total = _Bucket()
+
+
+class LogMetrics:
+    '''
+    Rolling window metrics of a PostgreSQL log record stream.
+
+    Records are counted in a ring of Resolution second slots covering the longest window.
+    Every window keeps the running total of its slots: a record is added to its slot and
+    to each window, and a slot leaving a window is subtracted from it once, so updates
+    and snapshots do not depend on the traffic and memory is fixed by the ring size.
+
+    Record times come from the log, a snapshot moves the windows to the wall clock so an
+    idle log decays. Thread safe: a tail thread can add while others read snapshots.
+
+    Parameters:
+        Windows - Window lengths in seconds (default: 60, 300, 900).
+        Resolution - Seconds per slot of the ring (default: 5).
+        SlowMs - Durations at or above it are slow queries (default: None, every logged duration,
+            RDS only logs the statements above log_min_duration_statement).
+    '''
+
+    __slots__ = ("Resolution", "SlowMs", "_size", "_slots", "_windows", "_head", "_start", "_stamp", "_lock")
+
+    def __init__(self,Windows: tuple = WINDOWS,Resolution: int = 5,SlowMs: float = None):
+        self.Resolution = Resolution
+        self.SlowMs = SlowMs
+        self._windows = [_Window(sec, -(-sec // Resolution)) for sec in sorted(Windows)]
+        self._size = self._windows[-1].Span
+        self._slots = [_Bucket() for _ in range(self._size)]
+        #NEWEST SLOT INDEX, TIME OF THE FIRST RECORD
+        self._head = None
+        self._start = None
+        #LAST TIMESTAMP PARSED, RECORDS OF THE SAME SECOND COME TOGETHER
+        self._stamp = (None, 0)
+        self._lock = threading.Lock()
+
+    def _Epoch(self,Time: str):
+        #2024-01-01 00:00:00 UTC
+        text = Time[:19]
+
+        if self._stamp[0] != text:
+            self._stamp = (text, calendar.timegm((int(text[0:4]), int(text[5:7]), int(text[8:10]), int(text[11:13]), int(text[14:16]), int(text[17:19]))))
+
+        return self._stamp[1]
+
+    def _Advance(self,Index: int):
+        '''
+        Move the newest slot to Index, subtracting the slots that leave each window.
+        '''
+
+        for window in self._windows:
+            if Index - self._head >= window.Span:
+                #EVERY SLOT LEFT THE WINDOW
+                window.Total = _Bucket()
+                continue
+
+            for idx in range(self._head - window.Span + 1, Index - window.Span + 1):
+                slot = self._slots[idx % self._size]
+                if slot.Index == idx:
+                    window.Total.Subtract(slot)
+
+        self._head = Index
+
+    def Add(self,Record):
+        '''
+        Count a LogRecord.
+
+        Returns
+            True, False when it is older than the longest window
+        '''
+
+        when = self._Epoch(Record.Time)
+        index = int(when // self.Resolution)
+
+        duration = None
+        statement = False
+        message = Record.Message
+
+        if message.startswith("duration:"):
+            dur = DURATION.match(message)
+            if dur is not None:
+                duration = float(dur.group('duration'))
+                statement = dur.group('statement') is not None
+        elif message.startswith(_STATEMENT_MESSAGES):
+            statement = True
+
+        sev = _SEVERITY.get(Record.Severity)
+        slow = duration is not None and (self.SlowMs is None or duration >= self.SlowMs)
+
+        with self._lock:
+            if self._head is None:
+                self._head = index
+
+            if index > self._head:
+                self._Advance(index)
+            elif index <= self._head - self._size:
+                return False
+
+            if self._start is None or when < self._start:
+                self._start = when
+
+            slot = self._slots[index % self._size]
+            if slot.Index != index:
+                #THE OLD SLOT ALREADY LEFT EVERY WINDOW
+                self._slots[index % self._size] = slot = _Bucket(index)
+
+            for bucket in [slot] + [w.Total for w in self._windows if index > self._head - w.Span]:
+                if sev is not None:
+                    bucket.Counts[sev] += 1
+                if statement:
+                    bucket.Counts[_STATEMENTS] += 1
+                if slow:
+                    bucket.Counts[_SLOW] += 1
+                if duration is not None:
+                    bucket.Durations.Add(duration)
+
+        return True
+
+    def AddRecords(self,Records):
+        '''
+        Count LogRecords, e.g. TailLogs(Follow=True, Records=True).
+
+        Returns
+            self
+        '''
+
+        for record in Records:
+            self.Add(record)
+
+        return self
+
+    def Snapshot(self,Now: float = None):
+        '''
+        Get the metrics of every window.
+
+        Parameters:
+            Now - Epoch seconds to read the windows at (default: now).
+
+        Returns
+            {Window seconds: {Severities, Statements, Errors, Slow, StatementRate, ErrorRate, SlowRate, Mean, P50, P95, P99}}
+                Rates are per second, durations in milliseconds
+        '''
+
+        if Now is None:
+            Now = time.time()
+
+        out = {}
+
+        with self._lock:
+            index = int(Now // self.Resolution)
+            if self._head is not None and index > self._head:
+                self._Advance(index)
+
+            for window in self._windows:
+                counts = window.Total.Counts
+                sketch = window.Total.Durations
+                #A STREAM YOUNGER THAN THE WINDOW IS AVERAGED OVER ITS AGE
+                seconds = max(min(window.Seconds, Now - self._start), self.Resolution) if self._start is not None else window.Seconds
+                errors = sum(counts[x] for x in _ERRORS)
+
+                out[window.Seconds] = {
+                    "Severities": {sev: counts[x] for x, sev in enumerate(LEVELS) if counts[x]},
+                    "Statements": counts[_STATEMENTS],
+                    "Errors": errors,
+                    "Slow": counts[_SLOW],
+                    "StatementRate": round(counts[_STATEMENTS] / seconds, 3),
+                    "ErrorRate": round(errors / seconds, 3),
+                    "SlowRate": round(counts[_SLOW] / seconds, 3),
+                    "Mean": round(sketch.Mean, 3) if sketch.Count else None,
+                    "P50": round(sketch.Quantile(0.50), 3) if sketch.Count else None,
+                    "P95": round(sketch.Quantile(0.95), 3) if sketch.Count else None,
+                    "P99": round(sketch.Quantile(0.99), 3) if sketch.Count else None,
+                }
+
+        return out
+
+
+class LogMonitor:
+    '''
+    LogMetrics of many RDS instances, each fed by its own follow thread.
+
+    Snapshot reads every instance at once while the threads keep adding. Threads are
+    daemons and stop with Stop, an idle tail notices it at its next check.
+    '''
+
+    def __init__(self,Windows: tuple = WINDOWS,Resolution: int = 5,SlowMs: float = None):
+        self.windows = Windows
+        self.resolution = Resolution
+        self.slow_ms = SlowMs
+        self.metrics = {}
+        self.errors = {}
+        self.stopped = threading.Event()
+        self._threads = []
+
+    def Start(self,Instance: str,Follow):
+        '''
+        Start counting the records of an instance.
+
+        Parameters:
+            Instance - RDS instance name.
+            Follow - Callable returning the iterable of LogRecord to count, called on the thread.
+        '''
+
+        metrics = self.metrics[Instance] = LogMetrics(self.windows, self.resolution, self.slow_ms)
+
+        def run():
+            records = None
+            try:
+                records = Follow()
+                for record in records:
+                    if self.stopped.is_set():
+                        break
+                    metrics.Add(record)
+            except Exception as e:
+                self.errors[Instance] = str(e)
+            finally:
+                if hasattr(records, "close"):
+                    records.close()
+
+        thread = threading.Thread(target=run, name=f"LogMonitor-{Instance}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def Snapshot(self,Now: float = None):
+        '''
+        Get the metrics of every instance.
+
+        Returns
+            {Instance: {Window seconds: {...}}}, see LogMetrics.Snapshot
+        '''
+
+        if Now is None:
+            Now = time.time()
+
+        return {instance: metrics.Snapshot(Now) for instance, metrics in list(self.metrics.items())}
+
+    def Stop(self,Timeout: float = None):
+        '''
+        Stop the follow threads.
+
+        Parameters:
+            Timeout - Seconds to wait for each thread (default: None, do not wait).
+        '''
+
+        self.stopped.set()
+
+        if Timeout is not None:
+            for thread in self._threads:
+                thread.join(Timeout)
@@ -0,0 +1,190 @@
+import os
+import re
+import gzip
+from datetime import datetime, timezone
+from collections import namedtuple
+
+
+#START OF A LOG RECORD, THE %t OF THE RDS log_line_prefix
+STAMP = re.compile(r'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d')
+STAMP_BYTES = re.compile(rb'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d')
+
+#postgresql.log.2024-01-01-00 OR postgresql.log.2024-01-01-0000
+FILE_HOUR = re.compile(r'(\d{4}-\d\d-\d\d)-(\d\d)(\d\d)?(?:\.gz)?$')
+
+SearchMatch = namedtuple("SearchMatch", ["Time", "Instance", "LogFile", "Text"])
+
+#PATTERNS COMPILED ONCE PER WORKER PROCESS
+_COMPILED = {}
+
+
+def Stamp(Value):
+    '''
+    Format a datetime as the log timestamps, naive datetimes are UTC.
+
+    Parameters:
+        Value - datetime or None.
+
+    Returns
+        YYYY-MM-DD HH:MM:SS or None
+    '''
+
+    if Value is None:
+        return None
+
+    if Value.tzinfo is not None:
+        Value = Value.astimezone(timezone.utc)
+
+    return Value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def FileStart(LogFile: str):
+    '''
+    Get the time the first record of a log file can have from its name.
+
+    Returns
+        YYYY-MM-DD HH:MM:SS or None when the name carries no hour
+    '''
+
+    match = FILE_HOUR.search(LogFile)
+
+    if match is None:
+        return None
+
+    return "{0} {1}:{2}:00".format(match.group(1), match.group(2), match.group(3) or "00")
+
+
+def InWindow(LogFile: str,LastWritten: int,Since: str,Until: str):
+    '''
+    Check if a log file can hold records between Since and Until.
+
+    Parameters:
+        LogFile - RDS log file name.
+        LastWritten - Epoch time in milliseconds of the last write.
+        Since, Until - YYYY-MM-DD HH:MM:SS, None for no bound.
+
+    Returns
+        True/False
+    '''
+
+    start = FileStart(LogFile)
+    end = Stamp(datetime.fromtimestamp(LastWritten / 1000, timezone.utc)) if LastWritten else None
+
+    if Until is not None and start is not None and start > Until:
+        return False
+    if Since is not None and end is not None and end < Since:
+        return False
+
+    return True
+
+
+def Chunks(Path: str,Size: int):
+    '''
+    Split a local log file into byte ranges that each start with a log record.
+
+    Gzip files cannot be split and are a single range.
+
+    Parameters:
+        Path - Local log file.
+        Size - Approximate bytes per range.
+
+    Returns
+        list of (Start, End), End is None for the whole file
+    '''
+
+    if Path.endswith(".gz"):
+        return [(0, None)]
+
+    total = os.path.getsize(Path)
+    bounds = [0]
+
+    with open(Path, "rb") as f:
+        pos = Size
+
+        while pos < total:
+            f.seek(pos)
+            #FINISH THE LINE, THEN MOVE TO THE NEXT RECORD SO A RECORD IS NEVER SPLIT
+            f.readline()
+            while True:
+                at = f.tell()
+                line = f.readline()
+                if not line or STAMP_BYTES.match(line):
+                    break
+
+            if not line:
+                break
+
+            bounds.append(at)
+            pos = at + Size
+
+    bounds.append(total)
+
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def SearchChunk(Path: str,Start: int,End: int,Pattern: str,Flags: int,Since: str,Until: str):
+    '''
+    Search a byte range of a local log file, run in a worker process.
+
+    The regex runs over the whole range at once and only the lines it matches are
+    looked at, so a range without matches costs one regex scan. It is compiled with
+    re.MULTILINE so ^ and $ match at every line, and a match must lie within one line:
+    when a match runs over a new line (\s, a negated class, . with DOTALL...) only its
+    first line is searched again on its own.
+
+    Parameters:
+        Path - Local log file.
+        Start, End - Byte range from Chunks, End None for the whole file.
+        Pattern - Regular expression.
+        Flags - re flags, re.MULTILINE is always added.
+        Since, Until - YYYY-MM-DD HH:MM:SS, None for no bound.
+
+    Returns
+        list of (Time, Line) in file order, Time is the timestamp of the record the line belongs to
+    '''
+
+    regex = _COMPILED.get((Pattern, Flags))
+    if regex is None:
+        regex = _COMPILED[(Pattern, Flags)] = re.compile(Pattern, Flags | re.MULTILINE)
+
+    if End is None:
+        with gzip.open(Path, "rb") if Path.endswith(".gz") else open(Path, "rb") as f:
+            data = f.read().decode("utf-8", "replace")
+    else:
+        with open(Path, "rb") as f:
+            f.seek(Start)
+            data = f.read(End - Start).decode("utf-8", "replace")
+
+    found = []
+    pos = 0
+
+    while pos <= len(data):
+        match = regex.search(data, pos)
+        #NOTHING, OR THE EMPTY END AFTER THE LAST NEW LINE
+        if match is None or (match.start() == len(data) and data.endswith("\n")):
+            break
+
+        begin = data.rfind("\n", 0, match.start()) + 1
+        end = data.find("\n", match.start())
+        end = len(data) if end == -1 else end
+
+        #ONE RESULT PER LINE, THE NEXT SEARCH STARTS ON THE NEXT LINE
+        pos = end + 1
+
+        #RAN OVER A NEW LINE, THE LINE MUST MATCH ON ITS OWN
+        if match.end() > end and regex.search(data, begin, end) is None:
+            continue
+
+        #CONTINUATION LINES TAKE THE TIMESTAMP OF THEIR RECORD
+        at = begin
+        while at > 0 and not STAMP.match(data, at):
+            at = data.rfind("\n", 0, at - 1) + 1
+        stamp = STAMP.match(data, at)
+        stamp = stamp.group(0) if stamp else ""
+
+        if (Since is not None and stamp and stamp < Since) or (Until is not None and stamp and stamp > Until):
+            continue
+
+        found.append((stamp, data[begin:end]))
+
+    return found
@@ -0,0 +1,163 @@
+import time
+import threading
+from RdsInstrumentation import THROTTLE_CODES
+
+
+#OPERATION FAMILY -> (REQUESTS PER SECOND, BURST)
+DEFAULT_LIMITS = {
+    "describe": (10.0, 20),
+    "logs": (5.0, 10),
+    "tagging": (5.0, 10),
+    "default": (5.0, 10),
+}
+
+
+def Family(Operation: str):
+    '''
+    Get the rate limit family of an RDS operation.
+
+    Parameters:
+        Operation - Operation name, e.g. DescribeDBInstances.
+
+    Returns
+        describe, logs, tagging or default
+    '''
+
+    if Operation == "DownloadDBLogFilePortion":
+        return "logs"
+    if Operation in ("AddTagsToResource", "RemoveTagsFromResource", "ListTagsForResource"):
+        return "tagging"
+    if Operation.startswith("Describe"):
+        return "describe"
+
+    return "default"
+
+
+class TokenBucket:
+    '''
+    Thread safe token bucket whose rate follows AIMD.
+
+    Every throttle halves the rate (down to MinRate), every successful call adds
+    Increase requests per second back (up to the configured Rate), so throughput settles
+    just below the account limit instead of bursting into throttles and backing off.
+    '''
+
+    def __init__(self,Rate: float,Burst: int,MinRate: float = 0.5,Increase: float = 0.05,Decrease: float = 0.5):
+        self.max_rate = float(Rate)
+        self.rate = float(Rate)
+        self.burst = float(Burst)
+        self.min_rate = min(MinRate, Rate)
+        self.increase = Increase
+        self.decrease = Decrease
+        self.throttles = 0
+        self._tokens = float(Burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _Refill(self,Now: float):
+        self._tokens = min(self.burst, self._tokens + (Now - self._last) * self.rate)
+        self._last = Now
+
+    def Acquire(self):
+        '''
+        Take a token, sleeping until one is available.
+
+        Returns
+            Seconds waited
+        '''
+
+        with self._lock:
+            self._Refill(time.monotonic())
+            #RESERVE THE TOKEN, A NEGATIVE BALANCE IS THE QUEUE OF WAITING THREADS
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+
+        return wait
+
+    def Throttled(self):
+        '''
+        Multiplicative decrease after a throttling error.
+        '''
+
+        with self._lock:
+            self._Refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.throttles += 1
+
+    def Success(self):
+        '''
+        Additive increase after a successful call.
+        '''
+
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._Refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+class RateLimiter:
+    '''
+    One TokenBucket per operation family, shared by every thread and client of an AwsRds.
+
+    Hooked on botocore before-send (every attempt, retries included, waits for a token)
+    and needs-retry (throttles decrease the rate, successes increase it).
+    '''
+
+    def __init__(self,Limits: dict = None):
+        limits = dict(DEFAULT_LIMITS)
+
+        for family, val in (Limits or {}).items():
+            #RATE OR (RATE, BURST)
+            limits[family] = tuple(val) if isinstance(val, (tuple, list)) else (float(val), max(int(val * 2), 1))
+
+        self.buckets = {family: TokenBucket(rate, burst) for family, (rate, burst) in limits.items()}
+
+    def Bucket(self,Operation: str):
+        '''
+        Get the bucket of an operation.
+        '''
+
+        return self.buckets.get(Family(Operation)) or self.buckets["default"]
+
+    def Register(self,Client):
+        '''
+        Hook the events of a boto3 client.
+
+        Parameters:
+            Client - boto3 client.
+
+        Returns
+            Nothing
+        '''
+
+        service = Client.meta.service_model.service_name
+        Client.meta.events.register(f"before-send.{service}", self._BeforeSend)
+        Client.meta.events.register(f"needs-retry.{service}", self._NeedsRetry)
+
+    def _BeforeSend(self,event_name,**kwargs):
+        self.Bucket(event_name.rsplit(".", 1)[-1]).Acquire()
+
+    def _NeedsRetry(self,response,operation,**kwargs):
+        if response is None:
+            return
+
+        bucket = self.Bucket(operation.name)
+        code = response[1].get("Error", {}).get("Code") if isinstance(response[1], dict) else None
+
+        if code in THROTTLE_CODES:
+            bucket.Throttled()
+        elif response[0] is not None and response[0].status_code < 300:
+            bucket.Success()
+
+    def Snapshot(self):
+        '''
+        Get the current rate of every family.
+
+        Returns
+            {Family: {Rate, MaxRate, Throttles}}
+        '''
+
+        return {family: {"Rate": round(b.rate, 3), "MaxRate": b.max_rate, "Throttles": b.throttles} for family, b in self.buckets.items()}
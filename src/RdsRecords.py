@@ -0,0 +1,148 @@
+import sys
+
+
+def _Intern(Value):
+    #ENGINE, STATUS, CLASS... REPEAT ACROSS THE WHOLE FLEET, KEEP ONE COPY OF EACH
+    return sys.intern(Value) if isinstance(Value, str) else Value
+
+
+def _Tags(TagList):
+    return tuple((_Intern(tag['Key']), _Intern(tag['Value'])) for tag in TagList or ())
+
+
+class _Record:
+    '''
+    Base of the compact records: fixed __slots__, no per instance __dict__.
+    '''
+
+    __slots__ = ()
+
+    def ToDict(self):
+        '''
+        Get the record as a dict of field -> value.
+        '''
+
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self,other):
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self):
+        return hash((type(self).__name__, getattr(self, self.__slots__[0])))
+
+    def __repr__(self):
+        return "{0}({1})".format(type(self).__name__, ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__))
+
+
+class InstanceInfo(_Record):
+    '''
+    The fields of a describe_db_instances entry AwsRds uses.
+    '''
+
+    __slots__ = ("Identifier", "Engine", "Status", "InstanceClass", "Cluster", "Arn", "Tags")
+
+    def __init__(self,Identifier: str,Engine: str,Status: str,InstanceClass: str = None,Cluster: str = None,Arn: str = None,Tags: tuple = ()):
+        self.Identifier = Identifier
+        self.Engine = _Intern(Engine)
+        self.Status = _Intern(Status)
+        self.InstanceClass = _Intern(InstanceClass)
+        self.Cluster = _Intern(Cluster)
+        self.Arn = Arn
+        self.Tags = Tags
+
+    @classmethod
+    def FromDescribe(cls,Item: dict):
+        '''
+        Build the record of a describe_db_instances entry.
+        '''
+
+        return cls(
+            Item['DBInstanceIdentifier'],
+            Item.get('Engine'),
+            Item.get('DBInstanceStatus'),
+            Item.get('DBInstanceClass'),
+            Item.get('DBClusterIdentifier'),
+            Item.get('DBInstanceArn'),
+            _Tags(Item.get('TagList')),
+        )
+
+
+class ClusterInfo(_Record):
+    '''
+    The fields of a describe_db_clusters entry AwsRds uses.
+    '''
+
+    __slots__ = ("Identifier", "Engine", "Status", "Arn", "Members", "Tags")
+
+    def __init__(self,Identifier: str,Engine: str,Status: str,Arn: str = None,Members: tuple = (),Tags: tuple = ()):
+        self.Identifier = _Intern(Identifier)
+        self.Engine = _Intern(Engine)
+        self.Status = _Intern(Status)
+        self.Arn = Arn
+        self.Members = Members
+        self.Tags = Tags
+
+    @classmethod
+    def FromDescribe(cls,Item: dict):
+        '''
+        Build the record of a describe_db_clusters entry.
+        '''
+
+        return cls(
+            Item['DBClusterIdentifier'],
+            Item.get('Engine'),
+            Item.get('Status'),
+            Item.get('DBClusterArn'),
+            tuple(mem['DBInstanceIdentifier'] for mem in Item.get('DBClusterMembers', ())),
+            _Tags(Item.get('TagList')),
+        )
+
+
+class SnapshotInfo(_Record):
+    '''
+    The fields of a describe_db_cluster_snapshots entry AwsRds uses.
+    '''
+
+    __slots__ = ("Identifier", "Cluster", "CreateTime", "Status", "Type")
+
+    def __init__(self,Identifier: str,Cluster: str,CreateTime,Status: str = None,Type: str = None):
+        self.Identifier = Identifier
+        self.Cluster = _Intern(Cluster)
+        self.CreateTime = CreateTime
+        self.Status = _Intern(Status)
+        self.Type = _Intern(Type)
+
+    @classmethod
+    def FromDescribe(cls,Item: dict):
+        '''
+        Build the record of a describe_db_cluster_snapshots entry.
+        '''
+
+        return cls(
+            Item['DBClusterSnapshotIdentifier'],
+            Item.get('DBClusterIdentifier'),
+            Item.get('SnapshotCreateTime'),
+            Item.get('Status'),
+            Item.get('SnapshotType'),
+        )
+
+
+class LogFileInfo(_Record):
+    '''
+    The fields of a describe_db_log_files entry AwsRds uses.
+    '''
+
+    __slots__ = ("Name", "LastWritten", "Size")
+
+    def __init__(self,Name: str,LastWritten: int,Size: int):
+        self.Name = Name
+        self.LastWritten = LastWritten
+        self.Size = Size
+
+    @classmethod
+    def FromDescribe(cls,Item: dict):
+        '''
+        Build the record of a describe_db_log_files entry.
+        '''
+
+        return cls(Item['LogFileName'], Item.get('LastWritten', 0), Item.get('Size', 0))